@@ -0,0 +1,182 @@
+"""Response cache for AI advice.
+
+Entries are keyed by user, normalized query and a hash of the prompt
+context, so an answer is reused only while the data it was based on is
+unchanged. Any new transaction or goal change alters the context and
+simply misses; stale entries age out through TTL and LRU eviction.
+
+    ADVICE_CACHE_BACKEND  memory (default) or database
+    ADVICE_CACHE_TTL      seconds an answer stays valid (default 3600)
+    ADVICE_CACHE_SIZE     max entries kept (default 1024)
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Case, spacing and trailing punctuation don't change the question"""
+    return _WHITESPACE.sub(" ", query).strip().rstrip("?!. ").lower()
+
+
+def advice_key(user_id: int, query: str, context: str) -> str:
+    context_hash = hashlib.sha256(context.encode("utf-8")).hexdigest()
+    raw = f"{user_id}\x00{normalize_query(query)}\x00{context_hash}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class MemoryStore:
+    """Process-local LRU with per-entry expiry"""
+
+    blocking = False
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class DatabaseStore:
+    """Cache rows shared by every worker process; LRU by last_used_at"""
+
+    blocking = True
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+
+    def _session(self):
+        from .database import SessionLocal
+        return SessionLocal()
+
+    def get(self, key: str) -> Optional[str]:
+        db = self._session()
+        try:
+            entry = db.get(models.AdviceCacheEntry, key)
+            if entry is None:
+                return None
+            now = datetime.utcnow()
+            if entry.expires_at <= now:
+                db.delete(entry)
+                db.commit()
+                return None
+            entry.last_used_at = now
+            db.commit()
+            return entry.advice
+        finally:
+            db.close()
+
+    def set(self, key: str, value: str, ttl: float):
+        db = self._session()
+        try:
+            now = datetime.utcnow()
+            db.merge(models.AdviceCacheEntry(
+                key=key,
+                advice=value,
+                created_at=now,
+                last_used_at=now,
+                expires_at=now + timedelta(seconds=ttl)
+            ))
+            db.flush()
+
+            entry = models.AdviceCacheEntry
+            db.query(entry).filter(entry.expires_at <= now).delete(synchronize_session=False)
+            evict = db.query(entry.key).order_by(entry.last_used_at.desc()).offset(self.max_entries)
+            db.query(entry).filter(entry.key.in_(evict.scalar_subquery())).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def __len__(self) -> int:
+        db = self._session()
+        try:
+            return db.query(models.AdviceCacheEntry).count()
+        finally:
+            db.close()
+
+
+class AdviceCache:
+    def __init__(self, store, ttl: float):
+        self.store = store
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            value = self.store.get(key)
+        except Exception:
+            # A broken cache must never fail the request
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str):
+        try:
+            self.store.set(key, value, self.ttl)
+        except Exception:
+            pass
+
+    async def aget(self, key: str) -> Optional[str]:
+        """get() for async handlers; blocking stores run off the event loop"""
+        if self.store.blocking:
+            return await run_in_threadpool(self.get, key)
+        return self.get(key)
+
+    async def aset(self, key: str, value: str):
+        if self.store.blocking:
+            await run_in_threadpool(self.set, key, value)
+        else:
+            self.set(key, value)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.store).__name__,
+            "entries": len(self.store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+def create_advice_cache() -> AdviceCache:
+    max_entries = int(os.getenv("ADVICE_CACHE_SIZE", "1024"))
+    backend = os.getenv("ADVICE_CACHE_BACKEND", "memory").lower()
+    store = DatabaseStore(max_entries) if backend == "database" else MemoryStore(max_entries)
+    return AdviceCache(store, ttl=float(os.getenv("ADVICE_CACHE_TTL", "3600")))
@@ -0,0 +1,163 @@
+"""Prompt context for the AI advisor, built from SQL aggregates.
+
+Instead of listing raw transactions, the prompt summarizes the user's
+whole history: balance, 30-day flows against the 30 days before, spending
+per category over 30 and 90 days, top merchants and goal progress. Lines
+are added in priority order until the token budget (AI_CONTEXT_TOKENS)
+is used up.
+"""
+import math
+import os
+import re
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from . import models
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKENS", "350"))
+TOP_MERCHANTS = 5
+
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count: ~4 letters or ~3 digits per token, one per symbol"""
+    total = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if piece[0].isalpha():
+            total += math.ceil(len(piece) / 4)
+        elif piece[0].isdigit():
+            total += math.ceil(len(piece) / 3)
+        else:
+            total += 1
+    return total
+
+
+async def load_advice_summary(db: "AsyncSession", user_id: int, now: Optional[datetime] = None) -> Dict:
+    """Aggregate everything the prompt needs in a handful of grouped queries"""
+    now = now or datetime.utcnow()
+    since_30 = now - timedelta(days=30)
+    since_60 = now - timedelta(days=60)
+    since_90 = now - timedelta(days=90)
+    txn = models.Transaction
+    value = func.abs(txn.amount)
+
+    flows = (await db.execute(
+        select(
+            txn.type,
+            txn.category,
+            func.coalesce(func.sum(value).filter(txn.date >= since_30), 0.0),
+            func.coalesce(func.sum(value).filter(txn.date < since_30, txn.date >= since_60), 0.0),
+            func.coalesce(func.sum(value), 0.0)
+        ).filter(
+            txn.user_id == user_id,
+            txn.date >= since_90
+        ).group_by(txn.type, txn.category)
+    )).all()
+
+    merchants = (await db.execute(
+        select(txn.title, func.sum(value).label("total")).filter(
+            txn.user_id == user_id,
+            txn.type == "expense",
+            txn.date >= since_90
+        ).group_by(txn.title).order_by(func.sum(value).desc()).limit(TOP_MERCHANTS)
+    )).all()
+
+    goals = (await db.execute(
+        select(models.Goal.title, models.Goal.target, models.Goal.current, models.Goal.deadline).filter(
+            models.Goal.user_id == user_id
+        ).order_by(models.Goal.deadline)
+    )).all()
+
+    balance = (await db.execute(
+        select(models.BalanceRollup.total_income, models.BalanceRollup.total_expenses).filter(
+            models.BalanceRollup.user_id == user_id
+        )
+    )).first()
+
+    summary = {
+        "total_income": balance.total_income if balance else 0.0,
+        "total_expenses": balance.total_expenses if balance else 0.0,
+        "income_30": 0.0,
+        "income_prev_30": 0.0,
+        "expenses_30": 0.0,
+        "expenses_prev_30": 0.0,
+        "categories": [],
+        "merchants": [{"name": row.title, "total": row.total} for row in merchants],
+        "goals": [
+            {"title": row.title, "target": row.target, "current": row.current or 0.0, "deadline": row.deadline}
+            for row in goals
+        ],
+    }
+    for txn_type, category, last_30, prev_30, last_90 in flows:
+        if txn_type == "income":
+            summary["income_30"] += last_30
+            summary["income_prev_30"] += prev_30
+        elif txn_type == "expense":
+            summary["expenses_30"] += last_30
+            summary["expenses_prev_30"] += prev_30
+            summary["categories"].append({
+                "name": category, "last_30": last_30, "prev_30": prev_30, "last_90": last_90
+            })
+    summary["categories"].sort(key=lambda c: (c["last_30"], c["last_90"]), reverse=True)
+    return summary
+
+
+def _delta(current: float, previous: float) -> str:
+    if not previous:
+        return "new" if current else "flat"
+    change = (current - previous) / previous * 100
+    return f"{change:+.0f}%"
+
+
+def render_advice_context(summary: Dict, budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Format the summary, most important lines first, within the token budget"""
+    income, expenses = summary["income_30"], summary["expenses_30"]
+    savings_rate = (income - expenses) / income * 100 if income > 0 else 0
+
+    sections = [
+        ("Financial Overview:", [
+            f"- Total Balance: ${summary['total_income'] - summary['total_expenses']:.2f}",
+            f"- Last 30 Days Income: ${income:.2f} ({_delta(income, summary['income_prev_30'])} vs prior 30 days)",
+            f"- Last 30 Days Expenses: ${expenses:.2f} "
+            f"({_delta(expenses, summary['expenses_prev_30'])} vs prior 30 days)",
+            f"- Savings Rate: {savings_rate:.1f}%",
+        ]),
+        ("Spending by Category (30 days / 90 days):", [
+            f"- {c['name']}: ${c['last_30']:.2f} / ${c['last_90']:.2f} ({_delta(c['last_30'], c['prev_30'])})"
+            for c in summary["categories"]
+        ]),
+        ("Financial Goals:", [
+            f"- {g['title']}: ${g['current']:.2f} / ${g['target']:.2f} "
+            f"({(g['current'] / g['target'] * 100) if g['target'] else 0:.0f}%"
+            + (f", due {g['deadline']:%Y-%m-%d})" if g["deadline"] else ")")
+            for g in summary["goals"]
+        ]),
+        ("Top Merchants (90 days):", [
+            f"- {m['name']}: ${m['total']:.2f}" for m in summary["merchants"]
+        ]),
+    ]
+
+    lines: List[str] = []
+    used = 0
+    for header, items in sections:
+        if not items:
+            continue
+        cost = estimate_tokens(header) + 1
+        if used + cost + estimate_tokens(items[0]) > budget:
+            continue
+        lines.append(header)
+        used += cost
+        for item in items:
+            item_cost = estimate_tokens(item) + 1
+            if used + item_cost > budget:
+                # Items are ranked, so everything after this matters less
+                break
+            lines.append(item)
+            used += item_cost
+    return "\n".join(lines)
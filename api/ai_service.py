@@ -1,6 +1,66 @@
-import httpx
+import asyncio
+import json
 import os
-from typing import Dict, List
+import time
+from typing import TYPE_CHECKING, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class CircuitBreaker:
+    """Skip a provider after repeated failures; let one trial call through every reset_after seconds"""
+
+    def __init__(self, threshold: int, reset_after: float):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at >= self.reset_after:
+            # Half-open: this caller is the trial, everyone else keeps skipping
+            self.opened_at = now
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+
+
+class AIProvider:
+    """One OpenAI-compatible chat completions endpoint"""
+
+    def __init__(self, name: str, api_url: str, api_key: str, model: str, breaker: CircuitBreaker):
+        self.name = name
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+        self.breaker = breaker
+
+    def request(self, payload: Dict) -> Dict:
+        return {
+            "url": self.api_url,
+            "headers": {"Authorization": f"Bearer {self.api_key}"},
+            "json": {"model": self.model, **payload}
+        }
 
 
 class GrokAIService:
@@ -10,20 +70,214 @@ class GrokAIService:
             raise Exception("XAI_API_KEY not found in environment variables")
 
         self.model = "llama-3.3-70b-versatile"
-        self.api_url = "https://api.x.ai/v1/chat/completions"
+        self.api_url = os.getenv("XAI_API_URL", "https://api.x.ai/v1/chat/completions")
+
+        # Provider chain: the primary, then an optional OpenAI-compatible
+        # fallback that is hedged in when the primary is slower than
+        # AI_HEDGE_AFTER seconds (set it near the primary's p95 latency)
+        self.hedge_after = float(os.getenv("AI_HEDGE_AFTER", "4"))
+        failures = int(os.getenv("AI_BREAKER_FAILURES", "3"))
+        reset_after = float(os.getenv("AI_BREAKER_RESET", "30"))
+        self.providers = [
+            AIProvider("primary", self.api_url, self.api_key, self.model, CircuitBreaker(failures, reset_after))
+        ]
+        if os.getenv("AI_FALLBACK_URL"):
+            self.providers.append(AIProvider(
+                "fallback",
+                os.getenv("AI_FALLBACK_URL"),
+                os.getenv("AI_FALLBACK_API_KEY", self.api_key),
+                os.getenv("AI_FALLBACK_MODEL", self.model),
+                CircuitBreaker(failures, reset_after)
+            ))
+
+        # One pooled client is shared by every call; see start()/aclose().
+        # httpx is imported here, with the service, not when the API imports
+        import httpx
+
+        self.timeout = httpx.Timeout(
+            float(os.getenv("AI_HTTP_TIMEOUT", "30")),
+            connect=float(os.getenv("AI_CONNECT_TIMEOUT", "5"))
+        )
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("AI_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("AI_MAX_KEEPALIVE_CONNECTIONS", "10")),
+            keepalive_expiry=float(os.getenv("AI_KEEPALIVE_EXPIRY", "60"))
+        )
+        # HTTP/2 needs the optional h2 package (pip install httpx[http2])
+        self.http2 = os.getenv("AI_HTTP2", "false").lower() == "true" and _http2_available()
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    @property
+    def client(self) -> "httpx.AsyncClient":
+        """The shared client, created on first use if start() wasn't called"""
+        if self._client is None or self._client.is_closed:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2
+            )
+        return self._client
+
+    async def start(self):
+        """Open the pooled client; called from the app lifespan"""
+        _ = self.client
+
+    async def aclose(self):
+        """Close the pooled client and its keep-alive connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _hedge(self, attempt: Callable[[AIProvider], Awaitable], discard: Callable = None):
+        """Run attempt() against the provider chain and return the first success.
+
+        The next provider is started as soon as one fails, or when none has
+        answered within hedge_after seconds; slower attempts are cancelled.
+        """
+        providers = iter(self.providers)
+        pending: Dict[asyncio.Future, AIProvider] = {}
+        last_error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            # Ask each breaker only when its provider is about to be tried, so
+            # an open breaker's half-open trial isn't spent on a hedge that
+            # never launches
+            for provider in providers:
+                if provider.breaker.allow():
+                    pending[asyncio.ensure_future(attempt(provider))] = provider
+                    return True
+            return False
+
+        if not launch():
+            raise Exception("All AI providers are unavailable")
+        exhausted = False
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=None if exhausted else self.hedge_after,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    exhausted = not launch()
+                    continue
+
+                winner = None
+                for task in done:
+                    del pending[task]
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                    elif winner is None:
+                        winner = task.result()
+                    elif discard:
+                        await discard(task.result())
+                if winner is not None:
+                    return winner
+                if not exhausted:
+                    exhausted = not launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if discard and not isinstance(result, BaseException):
+                    await discard(result)
+
+    async def _complete_with(self, provider: AIProvider, payload: Dict) -> str:
+        try:
+            response = await self.client.post(**provider.request(payload))
+            if response.status_code != 200:
+                raise Exception(f"{provider.name} API error: {response.status_code} - {response.text}")
+            content = response.json()["choices"][0]["message"]["content"]
+        except Exception:
+            provider.breaker.record_failure()
+            raise
+        provider.breaker.record_success()
+        return content
+
+    async def _complete(self, payload: Dict) -> str:
+        """Chat completion content from the fastest healthy provider"""
+        return await self._hedge(lambda provider: self._complete_with(provider, payload))
+
+    async def _stream_with(self, provider: AIProvider, payload: Dict) -> AsyncIterator[str]:
+        try:
+            async with self.client.stream("POST", **provider.request({**payload, "stream": True})) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise Exception(
+                        f"{provider.name} API error: {response.status_code} - {body.decode(errors='replace')}"
+                    )
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {})
+                    if delta.get("content"):
+                        yield delta["content"]
+        except Exception:
+            provider.breaker.record_failure()
+            raise
+        provider.breaker.record_success()
+
+    async def _open_stream(self, provider: AIProvider, payload: Dict):
+        """Start a stream and wait for its first token; (stream, first token or None)"""
+        stream = self._stream_with(provider, payload)
+        try:
+            return stream, await stream.__anext__()
+        except StopAsyncIteration:
+            return stream, None
+        except BaseException:
+            await stream.aclose()
+            raise
+
+    async def _stream(self, payload: Dict) -> AsyncIterator[str]:
+        """Stream from whichever healthy provider produces a first token first"""
+        async def discard(opened):
+            await opened[0].aclose()
+
+        stream, first = await self._hedge(lambda provider: self._open_stream(provider, payload), discard)
+        try:
+            if first is not None:
+                yield first
+                async for token in stream:
+                    yield token
+        finally:
+            await stream.aclose()
 
     async def get_financial_advice(
             self,
             user_query: str,
             transactions: List[Dict] = None,
             goals: List[Dict] = None,
-            stats: Dict = None
+            stats: Dict = None,
+            context: Optional[str] = None
     ) -> str:
         """Get financial advice from Grok AI based on user data"""
 
-        # Build context from user data
-        context = self._build_context(transactions, goals, stats)
+        # Build context from user data unless the caller already did
+        if context is None:
+            context = self.build_context(transactions, goals, stats)
+
+        messages = self._advice_messages(user_query, context)
+
+        # Call Grok API
+        try:
+            return await self._complete({
+                "messages": messages,
+                "temperature": 0.7,
+                "max_tokens": 500
+            })
+
+        except Exception as e:
+            raise Exception(f"Failed to get AI advice: {str(e)}")
 
+    def _advice_messages(self, user_query: str, context: str) -> List[Dict]:
         # Create system prompt
         system_prompt = """You are a financial advisor AI assistant. Analyze user's financial data and provide personalized advice.
 Be concise, actionable, and friendly. Focus on savings, spending patterns, and goal achievement."""
@@ -36,37 +290,56 @@ Financial Context:
 
 Provide helpful financial advice based on this data."""
 
-        # Call Grok API
-        try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.api_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_message}
-                        ],
-                        "temperature": 0.7,
-                        "max_tokens": 500
-                    },
-                    timeout=30.0
-                )
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message}
+        ]
+
+    async def stream_financial_advice(self, user_query: str, context: str) -> AsyncIterator[str]:
+        """Stream advice tokens as the model generates them.
 
-                if response.status_code == 200:
-                    data = response.json()
-                    return data["choices"][0]["message"]["content"]
-                else:
-                    raise Exception(f"Grok API error: {response.status_code} - {response.text}")
+        Closing the generator (e.g. when the client disconnects) closes the
+        upstream response and stops the generation.
+        """
+        stream = self._stream({
+            "messages": self._advice_messages(user_query, context),
+            "temperature": 0.7,
+            "max_tokens": 500
+        })
+        try:
+            async for token in stream:
+                yield token
 
         except Exception as e:
             raise Exception(f"Failed to get AI advice: {str(e)}")
+        finally:
+            await stream.aclose()
+
+    async def categorize_merchants(self, merchants: List[str], categories: List[str]) -> Dict[str, str]:
+        """Categorize many merchant names in one call; returns {merchant: category}"""
+        prompt = f"""Assign each merchant below to exactly one of these categories: {", ".join(categories)}.
+Use "Other" when unsure. Reply with only a JSON object mapping each merchant name, exactly as given, to its category.
+
+Merchants:
+""" + "\n".join(f"- {merchant}" for merchant in merchants)
+
+        content = await self._complete({
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0,
+            "max_tokens": 20 * len(merchants) + 50,
+            "response_format": {"type": "json_object"}
+        })
 
-    def _build_context(self, transactions: List[Dict], goals: List[Dict], stats: Dict) -> str:
+        # Tolerate a fenced or prefixed reply around the JSON object
+        start, end = content.find("{"), content.rfind("}")
+        if start < 0 or end < start:
+            raise Exception("AI reply did not contain a JSON object")
+        answers = json.loads(content[start:end + 1])
+        return {str(merchant).strip().lower(): str(category).strip() for merchant, category in answers.items()}
+
+    def build_context(self, transactions: List[Dict], goals: List[Dict], stats: Dict) -> str:
         """Build context string from user's financial data"""
         context_parts = []
 
@@ -125,32 +398,17 @@ Provide:
 3. One actionable recommendation"""
 
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.api_url,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "model": self.model,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.5,
-                        "max_tokens": 300
-                    },
-                    timeout=30.0
-                )
-
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "analysis": data["choices"][0]["message"]["content"],
-                        "categories": categories
-                    }
-                else:
-                    return {"analysis": "Unable to analyze spending patterns", "categories": categories}
+            analysis = await self._complete({
+                "messages": [
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.5,
+                "max_tokens": 300
+            })
+            return {
+                "analysis": analysis,
+                "categories": categories
+            }
 
         except Exception as e:
             return {"analysis": f"Error: {str(e)}", "categories": categories}
\ No newline at end of file
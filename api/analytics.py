@@ -0,0 +1,75 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+
+GRANULARITIES = ("day", "week", "month", "year")
+
+_SQLITE_FORMATS = {"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}
+_POSTGRES_FORMATS = {"day": "YYYY-MM-DD", "week": "YYYY-MM-DD", "month": "YYYY-MM", "year": "YYYY"}
+
+
+def period_column(db: Session, column, granularity: str):
+    """SQL expression labelling a datetime column with its period.
+
+    Weeks are labelled by their Monday, so both dialects agree.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unsupported granularity: {granularity}")
+
+    if db.get_bind().dialect.name == "sqlite":
+        if granularity == "week":
+            return func.date(column, "weekday 0", "-6 days")
+        return func.strftime(_SQLITE_FORMATS[granularity], column)
+
+    return func.to_char(func.date_trunc(granularity, column), _POSTGRES_FORMATS[granularity])
+
+
+def spending_by_category(
+        db: Session,
+        user_id: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        granularity: Optional[str] = None
+) -> Dict:
+    """Aggregate expenses per category (and period) in the database"""
+    txn = models.Transaction
+    value = func.sum(func.abs(txn.amount)).label("value")
+    columns = [txn.category, value]
+    group_by = [txn.category]
+
+    if granularity:
+        period = period_column(db, txn.date, granularity).label("period")
+        columns.insert(0, period)
+        group_by.insert(0, period)
+
+    query = db.query(*columns).filter(
+        txn.user_id == user_id,
+        txn.type == "expense"
+    )
+    # "from" is inclusive, "to" is exclusive
+    if start is not None:
+        query = query.filter(txn.date >= start)
+    if end is not None:
+        query = query.filter(txn.date < end)
+
+    rows = query.group_by(*group_by).order_by(*group_by).all()
+
+    categories: Dict[str, float] = {}
+    series: List[Dict] = []
+    for row in rows:
+        categories[row.category] = categories.get(row.category, 0) + row.value
+        if granularity:
+            series.append({"period": row.period, "name": row.category, "value": row.value})
+
+    result = {
+        "data": [{"name": cat, "value": amt} for cat, amt in categories.items()],
+        "total": sum(categories.values())
+    }
+    if granularity:
+        result["granularity"] = granularity
+        result["series"] = series
+    return result
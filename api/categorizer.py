@@ -0,0 +1,234 @@
+"""Merchant -> category memo, filled in batches by the LLM.
+
+Keyword matching leaves many merchants in "Other". The batch job below
+collects the distinct merchant titles still in "Other", asks the model
+to categorize many of them per prompt, and stores each answer in the
+merchant_categories table. Email sync and manual entry consult that table
+(through an in-process LRU) before falling back, so every merchant costs
+at most one LLM lookup.
+
+    python -m api.categorizer [--user-id N] [--batch-size 50]
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .data_versions import bump_data_versions
+from .matcher import CATEGORIES
+
+UNCATEGORIZED = "Other"
+VALID_CATEGORIES = set(CATEGORIES) | {UNCATEGORIZED}
+BATCH_SIZE = 50
+
+# Keys longer than the column would fail the insert (and the batch) on Postgres
+MERCHANT_KEY_LENGTH = models.MerchantCategory.merchant.type.length
+
+_SPACES = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " .,-_*#/:"
+
+
+def normalize_merchant(title: str) -> str:
+    return _SPACES.sub(" ", title or "").strip(_EDGE_PUNCTUATION).lower()[:MERCHANT_KEY_LENGTH]
+
+
+class _LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Only known merchants are cached; unknown ones may be categorized later
+_memo = _LRU(int(os.getenv("MERCHANT_CACHE_SIZE", "10000")))
+
+
+def lookup_categories(db: Session, titles: Iterable[str]) -> Dict[str, str]:
+    """Known categories for the given titles, keyed by normalized merchant"""
+    found: Dict[str, str] = {}
+    missing = set()
+    for title in titles:
+        merchant = normalize_merchant(title)
+        if not merchant:
+            continue
+        category = _memo.get(merchant)
+        if category is None:
+            missing.add(merchant)
+        else:
+            found[merchant] = category
+
+    if missing:
+        memo = models.MerchantCategory
+        for merchant, category in db.query(memo.merchant, memo.category).filter(memo.merchant.in_(missing)):
+            _memo.put(merchant, category)
+            found[merchant] = category
+    return found
+
+
+def lookup_category(db: Session, title: str) -> Optional[str]:
+    return lookup_categories(db, [title]).get(normalize_merchant(title))
+
+
+def apply_known_categories(db: Session, rows: List[Dict]):
+    """Overwrite each row's category with the memoized one for its merchant"""
+    known = lookup_categories(db, {row["title"] for row in rows})
+    if not known:
+        return
+    for row in rows:
+        category = known.get(normalize_merchant(row["title"]))
+        if category and category != UNCATEGORIZED:
+            row["category"] = category
+
+
+def _uncategorized_rows(db: Session, user_id: Optional[int] = None) -> Dict[str, List[Tuple[int, int]]]:
+    """(transaction id, user id) of every "Other" row, keyed by normalized merchant"""
+    txn = models.Transaction
+    query = db.query(txn.id, txn.user_id, txn.title).filter(txn.category == UNCATEGORIZED)
+    if user_id is not None:
+        query = query.filter(txn.user_id == user_id)
+
+    rows: Dict[str, List[Tuple[int, int]]] = {}
+    for txn_id, txn_user_id, title in query:
+        merchant = normalize_merchant(title)
+        if merchant:
+            rows.setdefault(merchant, []).append((txn_id, txn_user_id))
+    return rows
+
+
+def _unknown_merchants(db: Session, merchants: Iterable[str]) -> List[str]:
+    merchants = set(merchants)
+    known = {
+        merchant for merchant, in db.query(models.MerchantCategory.merchant).filter(
+            models.MerchantCategory.merchant.in_(merchants)
+        )
+    } if merchants else set()
+    return sorted(merchants - known)
+
+
+def uncategorized_merchants(db: Session, user_id: Optional[int] = None) -> List[str]:
+    """Distinct merchants still in "Other" that the memo table doesn't know"""
+    txn = models.Transaction
+    query = db.query(txn.title).filter(txn.category == UNCATEGORIZED).distinct()
+    if user_id is not None:
+        query = query.filter(txn.user_id == user_id)
+    return _unknown_merchants(db, (normalize_merchant(title) for title, in query))
+
+
+def store_categories(db: Session, categories: Dict[str, str], user_id: Optional[int] = None,
+                     rows: Optional[Dict[str, List[Tuple[int, int]]]] = None) -> int:
+    """Save LLM answers and recategorize matching "Other" transactions; returns rows updated
+
+    rows is the merchant -> (id, user id) map from _uncategorized_rows; the
+    batch job passes the one it collected up front so each batch doesn't
+    rescan every "Other" row. Without it the rows are looked up here.
+    """
+    for merchant, category in categories.items():
+        db.merge(models.MerchantCategory(
+            merchant=merchant,
+            category=category,
+            source="llm",
+            created_at=datetime.utcnow()
+        ))
+        _memo.put(merchant, category)
+
+    if rows is None:
+        rows = _uncategorized_rows(db, user_id)
+
+    ids_by_category: Dict[str, List[int]] = {}
+    changed_users = set()
+    for merchant, category in categories.items():
+        if category == UNCATEGORIZED:
+            continue
+        for txn_id, txn_user_id in rows.get(merchant, ()):
+            ids_by_category.setdefault(category, []).append(txn_id)
+            changed_users.add(txn_user_id)
+
+    txn = models.Transaction
+    updated = 0
+    for category, ids in ids_by_category.items():
+        # Rows recategorized since the scan keep their new category
+        updated += db.query(txn).filter(txn.id.in_(ids), txn.category == UNCATEGORIZED).update(
+            {txn.category: category}, synchronize_session=False
+        )
+    bump_data_versions(db, changed_users)
+    db.commit()
+    return updated
+
+
+async def categorize_uncategorized(db: Session, ai_service, user_id: Optional[int] = None,
+                                   batch_size: int = BATCH_SIZE) -> Dict:
+    """Run the batch job: one prompt per batch_size merchants"""
+    # One scan of the "Other" rows serves every batch
+    rows = _uncategorized_rows(db, user_id)
+    merchants = _unknown_merchants(db, rows)
+    summary = {"merchants": len(merchants), "categorized": 0, "transactions_updated": 0, "failed_batches": 0}
+
+    for start in range(0, len(merchants), batch_size):
+        batch = merchants[start:start + batch_size]
+        try:
+            answers = await ai_service.categorize_merchants(batch, sorted(VALID_CATEGORIES))
+        except Exception:
+            summary["failed_batches"] += 1
+            continue
+
+        categories = {
+            merchant: answers[merchant] for merchant in batch if answers.get(merchant) in VALID_CATEGORIES
+        }
+        summary["categorized"] += len(categories)
+        summary["transactions_updated"] += store_categories(db, categories, user_id, rows)
+
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .ai_service import GrokAIService
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Categorize \"Other\" merchants in batches with the LLM")
+    parser.add_argument("--user-id", type=int, help="limit to a single user")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="merchants per prompt")
+    args = parser.parse_args(argv)
+
+    async def run():
+        ai_service = GrokAIService()
+        try:
+            return await categorize_uncategorized(db, ai_service, args.user_id, args.batch_size)
+        finally:
+            await ai_service.aclose()
+
+    db = SessionLocal()
+    try:
+        summary = asyncio.run(run())
+    finally:
+        db.close()
+
+    print(f"{summary['categorized']}/{summary['merchants']} merchant(s) categorized, "
+          f"{summary['transactions_updated']} transaction(s) updated, "
+          f"{summary['failed_batches']} batch(es) failed")
+    return 1 if summary["failed_batches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""Everything the dashboard shows, in one request.
+
+The bundle endpoint loads any of the sections below for the signed-in
+user on the request's read session. Only when the server pool profile is
+in use and the pool has connections to spare do the sections fan out to
+their own sessions so their round trips overlap; without a pool (the
+serverless profile) each extra session would be a fresh connect, and a
+busy pool would be exhausted by a few bundle requests. SQLite serializes
+access to the file anyway, so it never fans out.
+"""
+import asyncio
+from typing import Callable, Dict, Iterable, List
+
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
+
+from . import models
+from .analytics import spending_by_category
+from .database import ReadSessionLocal
+from .pooling import POOL_PROFILE, SERVER, max_overflow
+from .rollups import get_balance
+
+RECENT_TRANSACTIONS = 10
+
+
+def load_stats(db: Session, user_id: int) -> Dict:
+    total_income, total_expenses = get_balance(db, user_id)
+    total_balance = total_income - total_expenses
+    savings_rate = (total_balance / total_income * 100) if total_income > 0 else 0
+
+    return {
+        "total_balance": total_balance,
+        "monthly_income": total_income,
+        "monthly_expenses": total_expenses,
+        "savings_rate": round(savings_rate, 1)
+    }
+
+
+def load_recent_transactions(db: Session, user_id: int, limit: int = RECENT_TRANSACTIONS) -> List:
+    return db.query(models.Transaction).filter(
+        models.Transaction.user_id == user_id
+    ).order_by(models.Transaction.date.desc(), models.Transaction.id.desc()).limit(limit).all()
+
+
+def load_goals(db: Session, user_id: int) -> List:
+    return db.query(models.Goal).filter(models.Goal.user_id == user_id).all()
+
+
+def load_spending(db: Session, user_id: int) -> Dict:
+    return spending_by_category(db, user_id)
+
+
+def load_gmail_status(db: Session, user_id: int) -> Dict:
+    row = db.query(
+        models.User.gmail_connected,
+        models.User.gmail_email,
+        models.GmailConnection.last_synced,
+        models.GmailConnection.transactions_count
+    ).outerjoin(
+        models.GmailConnection, models.GmailConnection.user_id == models.User.id
+    ).filter(models.User.id == user_id).first()
+
+    connected = bool(row and row.gmail_connected)
+    return {
+        "connected": connected,
+        "email": row.gmail_email if connected else None,
+        "last_synced": row.last_synced if row else None,
+        "transactions_found": row.transactions_count if row else None
+    }
+
+
+SECTIONS: Dict[str, Callable[..., object]] = {
+    "stats": load_stats,
+    "transactions": load_recent_transactions,
+    "goals": load_goals,
+    "spending": load_spending,
+    "gmail": load_gmail_status,
+}
+
+
+def parse_fields(fields: str) -> List[str]:
+    """Section names from a comma-separated list; raises ValueError on unknown ones"""
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown dashboard fields: {', '.join(unknown)}; choose from {', '.join(SECTIONS)}")
+    return list(dict.fromkeys(names)) or list(SECTIONS)
+
+
+def _load_section(db: Session, user_id: int, name: str, limit: int):
+    if name == "transactions":
+        return load_recent_transactions(db, user_id, limit)
+    return SECTIONS[name](db, user_id)
+
+
+def _load_sequential(db: Session, user_id: int, names: Iterable[str], limit: int) -> Dict:
+    return {name: _load_section(db, user_id, name, limit) for name in names}
+
+
+def _load_isolated(user_id: int, name: str, limit: int):
+    db = ReadSessionLocal(user_id)
+    try:
+        return _load_section(db, user_id, name, limit)
+    finally:
+        db.close()
+
+
+def _can_fan_out(db: Session, sections: int) -> bool:
+    """Whether the pool can lend a connection per section and still keep a spare"""
+    if POOL_PROFILE != SERVER or sections < 2:
+        return False
+    engine = db.get_bind()
+    if engine.dialect.name == "sqlite" or not isinstance(engine.pool, QueuePool):
+        return False
+    pool = engine.pool
+    overflow = max_overflow(pool)
+    if overflow < 0:
+        return True
+    return pool.size() + overflow - pool.checkedout() > sections
+
+
+async def load_dashboard(db: Session, user_id: int, names: List[str],
+                         limit: int = RECENT_TRANSACTIONS) -> Dict:
+    """The requested sections, keyed by name"""
+    if not _can_fan_out(db, len(names)):
+        return await run_in_threadpool(_load_sequential, db, user_id, names, limit)
+
+    results = await asyncio.gather(*(
+        run_in_threadpool(_load_isolated, user_id, name, limit) for name in names
+    ))
+    return dict(zip(names, results))
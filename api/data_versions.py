@@ -0,0 +1,57 @@
+"""Per-user data versions for conditional GETs.
+
+users.data_version is bumped in the same transaction as every change to a
+user's transactions or goals (manual entry, import, Gmail sync, merchant
+recategorization). Read endpoints derive their ETag from it, so a client
+revalidating with If-None-Match gets a 304 after one primary-key lookup
+instead of the endpoint's own queries.
+"""
+from typing import Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import record_write
+
+
+def bump_data_version(db: Session, user_id: int):
+    """Mark the user's data changed; the caller commits"""
+    bump_data_versions(db, [user_id])
+
+
+def bump_data_versions(db: Session, user_ids: Iterable[int]):
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    db.query(models.User).filter(models.User.id.in_(user_ids)).update(
+        {models.User.data_version: models.User.data_version + 1},
+        synchronize_session=False
+    )
+    # Reads that would check the new version should hit the primary
+    for user_id in user_ids:
+        record_write(user_id)
+
+
+def get_data_version(db: Session, user_id: int) -> int:
+    version = db.query(models.User.data_version).filter(models.User.id == user_id).scalar()
+    return version or 0
+
+
+def data_etag(user_id: int, version: int) -> str:
+    return f'W/"{user_id}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/ prefixes don't matter
+    wanted = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == wanted:
+            return True
+    return False
@@ -1,27 +1,187 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import TYPE_CHECKING, Dict, Optional
 import os
+import threading
+import time
+
+from .pooling import POOL_PROFILE, SERVERLESS, engine_options, pool_status
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
 
 # Get database URL from environment
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-if not DATABASE_URL:
-    raise ValueError("DATABASE_URL environment variable is required")
+# Optional read replica for read-heavy endpoints; see ReadSessionLocal
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
 
 # Fix postgres:// to postgresql://
-if DATABASE_URL.startswith("postgres://"):
+if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+if REPLICA_DATABASE_URL and REPLICA_DATABASE_URL.startswith("postgres://"):
+    REPLICA_DATABASE_URL = REPLICA_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+Base = declarative_base()
 
-engine = create_engine(DATABASE_URL)
+# Nothing connects at import time: the engine is built on first use, so a
+# cold start only pays for it when a request actually needs the database
+_engine: Optional[Engine] = None
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
+def get_engine() -> Engine:
+    global _engine
+    if _engine is None:
+        if not DATABASE_URL:
+            raise ValueError("DATABASE_URL environment variable is required")
+        _engine = create_engine(DATABASE_URL, **engine_options())
+        _session_factory.configure(bind=_engine)
+    return _engine
+
+
+def SessionLocal() -> Session:
+    """A new session, creating the engine on first use"""
+    get_engine()
+    return _session_factory()
+
+
+def __getattr__(name: str):
+    # `from .database import engine` keeps working, lazily
+    if name == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+# Read replica. Listing and analytics endpoints read through
+# ReadSessionLocal, which uses the replica when REPLICA_DATABASE_URL is set
+# and the primary otherwise. For READ_YOUR_WRITES_SECONDS after a user
+# writes (record_write), their reads go to the primary so they don't see
+# replication lag. The window is per process.
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+MAX_TRACKED_WRITERS = 10000
+
+_replica_engine: Optional[Engine] = None
+_read_session_factory = sessionmaker(autocommit=False, autoflush=False)
+_recent_writes: Dict[int, float] = {}
+_recent_writes_lock = threading.Lock()
+
+
+@event.listens_for(_read_session_factory, "before_flush")
+def _refuse_writes(session, flush_context, instances):
+    raise RuntimeError("Read sessions are read-only; use get_db to write")
+
+
+def get_replica_engine() -> Engine:
+    """The replica engine, or the primary when no replica is configured"""
+    global _replica_engine
+    if not REPLICA_DATABASE_URL:
+        return get_engine()
+    if _replica_engine is None:
+        _replica_engine = create_engine(REPLICA_DATABASE_URL, **engine_options())
+    return _replica_engine
+
+
+def record_write(user_id: int):
+    """Pin the user's reads to the primary for the read-your-writes window"""
+    if not REPLICA_DATABASE_URL:
+        return
+    now = time.monotonic()
+    with _recent_writes_lock:
+        if len(_recent_writes) >= MAX_TRACKED_WRITERS:
+            for key in [key for key, until in _recent_writes.items() if until <= now]:
+                del _recent_writes[key]
+        _recent_writes[user_id] = now + READ_YOUR_WRITES_SECONDS
+
+
+def wrote_recently(user_id: int) -> bool:
+    with _recent_writes_lock:
+        until = _recent_writes.get(user_id)
+    return until is not None and until > time.monotonic()
+
+
+def ReadSessionLocal(user_id: Optional[int] = None) -> Session:
+    """A read-only session on the replica, or on the primary right after the user wrote"""
+    if user_id is not None and wrote_recently(user_id):
+        return _read_session_factory(bind=get_engine())
+    return _read_session_factory(bind=get_replica_engine())
+
+
+# Async engine for `async def` handlers, so their queries don't block the
+# event loop. Uses asyncpg for Postgres and aiosqlite for SQLite; created on
+# first use so sync-only processes (CLIs, workers) never need those drivers,
+# and sqlalchemy.ext.asyncio is only imported then too.
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(url: str) -> str:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+
+    query = dict(parsed.query)
+    # asyncpg spells libpq's sslmode as ssl
+    if backend == "postgresql" and "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend], query=query).render_as_string(hide_password=False)
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL")
+
+_async_engine: Optional["AsyncEngine"] = None
+_async_session_factory: Optional["async_sessionmaker"] = None
+
+
+def get_async_engine() -> "AsyncEngine":
+    global _async_engine, _async_session_factory
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        if not (ASYNC_DATABASE_URL or DATABASE_URL):
+            raise ValueError("DATABASE_URL environment variable is required")
+        url = ASYNC_DATABASE_URL or async_database_url(DATABASE_URL)
+        options = engine_options(is_async=True)
+        # Transaction-mode poolers hand each transaction a different server
+        # connection, which breaks asyncpg's cached prepared statements
+        if POOL_PROFILE == SERVERLESS and make_url(url).get_driver_name() == "asyncpg":
+            options["connect_args"] = {"statement_cache_size": 0}
+        _async_engine = create_async_engine(url, **options)
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False, autoflush=False)
+    return _async_engine
+
+
+async def dispose_async_engine():
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
+
+
+async def get_async_db():
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
+
+
+def pool_metrics() -> Dict:
+    """Pool status for whichever engines this process has created"""
+    metrics = {"profile": POOL_PROFILE}
+    if _engine is not None:
+        metrics["sync"] = pool_status(_engine.pool)
+    if _replica_engine is not None:
+        metrics["replica"] = pool_status(_replica_engine.pool)
+    if _async_engine is not None:
+        metrics["async"] = pool_status(_async_engine.pool)
+    return metrics
@@ -1,17 +1,122 @@
+import hashlib
 import imaplib
+import multiprocessing
 import email
+import email.message
+import email.utils
 from email.header import decode_header
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
-from typing import List, Dict, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Dict, Optional, Tuple
 import os
 
+from .matcher import categorize, find_amount, find_merchant, scan_alert
+
+# Header-first fetch pipeline settings
+HEADER_FIELDS = "SUBJECT FROM DATE MESSAGE-ID CONTENT-TYPE CONTENT-TRANSFER-ENCODING"
+HEADER_BATCH_SIZE = 500
+BODY_BATCH_SIZE = 50
+BODY_SIZE_CAP = 16 * 1024
+
+# Cheap local test on subject/sender deciding whether a body is worth downloading
+_ALERT_HINTS = re.compile(
+    r"debit|credit|transaction|txn|payment|purchase|spent|paid|withdraw|deposit|alert|upi|"
+    r"\b(?:rs|inr)\b|₹|hdfc|icici|sbi|axis|kotak|idfc|yes bank|indusind|pnb|bob|canara|union bank|bank",
+    re.IGNORECASE
+)
+
+_FETCH_MESSAGE_START = re.compile(rb"^\d+ \(")
+_FETCH_UID = re.compile(rb"UID (\d+)")
+_FETCH_SECTION = re.compile(rb"(BODY\[[^\]]*\](?:<\d+>)?|RFC822) \{\d+\}$")
+
+
+def uid_set(uids: List[int]) -> str:
+    """Compress sorted UIDs into an IMAP sequence set such as 1:4,7,9:10"""
+    ranges = []
+    for uid in sorted(uids):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(str(a) if a == b else f"{a}:{b}" for a, b in ranges)
+
+
+def parse_fetch_response(data: List) -> Dict[int, Dict[str, bytes]]:
+    """Group an imaplib UID FETCH response into {uid: {section: literal}}"""
+    messages: Dict[int, Dict[str, bytes]] = {}
+    current: Dict[str, bytes] = {}
+    current_uid: Optional[int] = None
+
+    def finish():
+        if current_uid is not None:
+            messages[current_uid] = current
+
+    for item in data:
+        prefix = item[0] if isinstance(item, tuple) else item
+        if not isinstance(prefix, bytes):
+            continue
+
+        if _FETCH_MESSAGE_START.match(prefix):
+            finish()
+            current, current_uid = {}, None
+
+        uid = _FETCH_UID.search(prefix)
+        if uid:
+            current_uid = int(uid.group(1))
+
+        if isinstance(item, tuple):
+            section = _FETCH_SECTION.search(prefix)
+            if section:
+                current[section.group(1).decode()] = item[1]
+
+    finish()
+    return messages
+
+
+def transaction_fingerprint(headers: email.message.Message, transaction: Dict) -> str:
+    """Stable id for the alert behind a transaction, independent of IMAP UIDs"""
+    message_id = (headers["Message-ID"] or "").strip()
+    if message_id:
+        source = f"message-id:{message_id}"
+    else:
+        source = "|".join(str(value) for value in (
+            headers["From"], headers["Date"], headers["Subject"], transaction["amount"], transaction["title"]
+        ))
+    return hashlib.sha256(source.encode(errors="replace")).hexdigest()
+
+
+def decode_subject(raw_subject: Optional[str]) -> str:
+    if not raw_subject:
+        return ""
+    subject_parts = decode_header(raw_subject)
+    return "".join([
+        part.decode(encoding or "utf-8", errors="replace") if isinstance(part, bytes) else part
+        for part, encoding in subject_parts
+    ])
+
+
+def extract_text(msg: email.message.Message) -> str:
+    """Return the first text/plain part of a message"""
+    if msg.is_multipart():
+        for part in msg.walk():
+            if part.get_content_type() == "text/plain":
+                return (part.get_payload(decode=True) or b"").decode(errors="replace")
+        return ""
+    return (msg.get_payload(decode=True) or b"").decode(errors="replace")
+
 
 class EmailTransactionParser:
     def __init__(self, email_address: str, password: str):
         self.email_address = email_address
         self.password = password
         self.imap = None
+        # Sync watermark, set by fetch_transactions
+        self.uid_validity: Optional[int] = None
+        self.last_uid: int = 0
+        # IMAP traffic of the last fetch_transactions call
+        self.stats = {"fetch_commands": 0, "bytes_fetched": 0, "headers": 0, "bodies": 0}
 
     def connect(self, imap_server: str = "imap.gmail.com"):
         """Connect to IMAP server"""
@@ -27,7 +132,8 @@ class EmailTransactionParser:
         if self.imap:
             self.imap.logout()
 
-    def parse_transaction_from_email(self, email_body: str, subject: str) -> Optional[Dict]:
+    @staticmethod
+    def parse_transaction_from_email(email_body: str, subject: str) -> Optional[Dict]:
         """Parse transaction details from email body and subject"""
         transaction = {
             "title": "",
@@ -38,55 +144,31 @@ class EmailTransactionParser:
             "date": datetime.now().isoformat()
         }
 
-        # Extract bank name from subject or body
-        banks = ["HDFC", "ICICI", "SBI", "Axis", "Kotak", "IDFC", "Yes Bank", "IndusInd", "PNB", "BOB", "Canara",
-                 "Union Bank"]
-        for bank in banks:
-            if bank.lower() in subject.lower() or bank.lower() in email_body.lower():
-                transaction["bank"] = bank
-                break
+        # Bank, direction and category keywords in one pass
+        match = scan_alert(subject, email_body)
+        transaction["bank"] = match.bank
 
         # Extract amount (INR patterns: Rs, INR, ₹)
-        amount_patterns = [
-            r'(?:Rs\.?|INR|₹)\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'(?:amount|Amount|AMOUNT)[\s:]*(?:Rs\.?|INR|₹)?\s*([0-9,]+(?:\.[0-9]{2})?)',
-            r'(?:debited|credited|spent|paid)[\s:]*(?:Rs\.?|INR|₹)?\s*([0-9,]+(?:\.[0-9]{2})?)'
-        ]
-
-        for pattern in amount_patterns:
-            match = re.search(pattern, email_body, re.IGNORECASE)
-            if match:
-                amount_str = match.group(1).replace(',', '')
-                transaction["amount"] = float(amount_str)
-                break
+        amount = find_amount(email_body)
+        if amount is not None:
+            transaction["amount"] = amount
 
         # Determine transaction type (credit/debit)
-        if any(word in email_body.lower() for word in ["credited", "credit", "received", "deposit"]):
+        if match.direction == "income":
             transaction["type"] = "income"
             transaction["amount"] = abs(transaction["amount"])
-        elif any(
-                word in email_body.lower() for word in ["debited", "debit", "spent", "paid", "purchase", "withdrawal"]):
+        elif match.direction == "expense":
             transaction["type"] = "expense"
             transaction["amount"] = -abs(transaction["amount"])
 
         # Extract merchant/title
-        merchant_patterns = [
-            r'(?:at|to|from)\s+([A-Z][A-Za-z0-9\s&]+?)(?:\s+on|\.|,)',
-            r'(?:merchant|Merchant|MERCHANT)[\s:]+([A-Za-z0-9\s&]+?)(?:\s+on|\.|,)',
-            r'(?:transaction at|payment to)\s+([A-Za-z0-9\s&]+?)(?:\s+on|\.|,)'
-        ]
-
-        for pattern in merchant_patterns:
-            match = re.search(pattern, email_body)
-            if match:
-                transaction["title"] = match.group(1).strip()
-                break
-
-        if not transaction["title"]:
+        transaction["title"] = find_merchant(email_body)
+        title_from_subject = not transaction["title"]
+        if title_from_subject:
             transaction["title"] = subject[:50]
 
         # Categorize transaction
-        transaction["category"] = self._categorize_transaction(transaction["title"], email_body)
+        transaction["category"] = match.category(title_from_subject)
 
         # Only return if amount was found
         if transaction["amount"] != 0.0:
@@ -95,109 +177,240 @@ class EmailTransactionParser:
 
     def _categorize_transaction(self, title: str, body: str) -> str:
         """Categorize transaction based on keywords"""
-        text = (title + " " + body).lower()
-
-        categories = {
-            "Food": ["restaurant", "cafe", "zomato", "swiggy", "food", "dining", "hotel", "eatery"],
-            "Shopping": ["amazon", "flipkart", "myntra", "shopping", "mall", "store", "mart", "retail"],
-            "Transport": ["uber", "ola", "petrol", "diesel", "fuel", "parking", "toll", "transport"],
-            "Utilities": ["electricity", "water", "gas", "bill", "utility", "broadband", "internet", "mobile",
-                          "recharge"],
-            "Entertainment": ["netflix", "prime", "spotify", "movie", "cinema", "entertainment", "subscription"],
-            "Healthcare": ["hospital", "clinic", "pharmacy", "medical", "doctor", "health"],
-            "Education": ["school", "college", "university", "course", "tuition", "education"],
-            "Income": ["salary", "credited", "credit", "received", "deposit", "income"]
-        }
-
-        for category, keywords in categories.items():
-            if any(keyword in text for keyword in keywords):
-                return category
-
-        return "Other"
-
-    def fetch_transactions(self, days: int = 30, search_criteria: str = None) -> List[Dict]:
-        """Fetch bank transaction emails from inbox"""
+        return categorize(title + " " + body)
+
+    def select_mailbox(self, mailbox: str = "INBOX") -> Tuple[Optional[int], Optional[int]]:
+        """Open a mailbox read-only and return its (UIDVALIDITY, UIDNEXT)"""
+        status, _ = self.imap.select(mailbox, readonly=True)
+        if status != "OK":
+            raise Exception(f"Unable to open mailbox {mailbox}")
+
+        values = []
+        for name in ("UIDVALIDITY", "UIDNEXT"):
+            _, data = self.imap.response(name)
+            values.append(int(data[0]) if data and data[0] else None)
+        return values[0], values[1]
+
+    def _uid_fetch(self, uids: List[int], items: str) -> Dict[int, Dict[str, bytes]]:
+        status, data = self.imap.uid("FETCH", uid_set(uids), items)
+        self.stats["fetch_commands"] += 1
+        if status != "OK":
+            return {}
+
+        messages = parse_fetch_response(data)
+        self.stats["bytes_fetched"] += sum(len(v) for sections in messages.values() for v in sections.values())
+        return messages
+
+    def fetch_headers(self, uids: List[int]) -> Dict[int, bytes]:
+        """Fetch the raw header block of the few headers needed for filtering"""
+        headers = {}
+        for i in range(0, len(uids), HEADER_BATCH_SIZE):
+            batch = uids[i:i + HEADER_BATCH_SIZE]
+            fetched = self._uid_fetch(batch, f"(BODY.PEEK[HEADER.FIELDS ({HEADER_FIELDS})])")
+            for uid, sections in fetched.items():
+                headers[uid] = next(iter(sections.values()), b"")
+        self.stats["headers"] += len(headers)
+        return headers
+
+    def fetch_bodies(self, uids: List[int], headers: Dict[int, email.message.Message]) -> Dict[int, bytes]:
+        """Fetch only the size-capped first MIME part of each message, in batches.
+
+        Each body comes back as a small standalone MIME entity: for multipart
+        messages the part's own MIME headers are fetched with it, so nested
+        alternatives and transfer encodings still decode.
+        """
+        multipart = [uid for uid in uids if headers[uid].get_content_maintype() == "multipart"]
+        single = [uid for uid in uids if headers[uid].get_content_maintype() != "multipart"]
+        section = f"BODY.PEEK[1]<0.{BODY_SIZE_CAP}>"
+
+        bodies = {}
+        for group, items in ((multipart, f"(BODY.PEEK[1.MIME] {section})"), (single, f"({section})")):
+            for i in range(0, len(group), BODY_BATCH_SIZE):
+                fetched = self._uid_fetch(group[i:i + BODY_BATCH_SIZE], items)
+                for uid, sections in fetched.items():
+                    part = sections.get("BODY[1]<0>", sections.get("BODY[1]", b""))
+                    if uid in multipart:
+                        mime_headers = sections.get("BODY[1.MIME]", b"")
+                    else:
+                        top = headers[uid]
+                        mime_headers = "".join(
+                            f"{name}: {top[name]}\r\n"
+                            for name in ("Content-Type", "Content-Transfer-Encoding") if top[name]
+                        ).encode() + b"\r\n"
+                    bodies[uid] = mime_headers + part
+
+        self.stats["bodies"] += len(bodies)
+        return bodies
+
+    @staticmethod
+    def looks_like_alert(headers: email.message.Message) -> bool:
+        return bool(_ALERT_HINTS.search(f"{decode_subject(headers['Subject'])} {headers['From'] or ''}"))
+
+    def iter_alert_batches(self, uids: List[int]) -> Iterator[List[Tuple[bytes, bytes]]]:
+        """Yield (raw headers, raw body) batches of likely alerts, fetched header-first"""
+        for i in range(0, len(uids), HEADER_BATCH_SIZE):
+            window = uids[i:i + HEADER_BATCH_SIZE]
+            raw_headers = self.fetch_headers(window)
+            headers = {uid: email.message_from_bytes(raw) for uid, raw in raw_headers.items()}
+            candidates = [uid for uid in window if uid in headers and self.looks_like_alert(headers[uid])]
+
+            for j in range(0, len(candidates), BODY_BATCH_SIZE):
+                batch = candidates[j:j + BODY_BATCH_SIZE]
+                bodies = self.fetch_bodies(batch, headers)
+                yield [(raw_headers[uid], bodies[uid]) for uid in batch if uid in bodies]
+
+    def _search_uids(self, search_criteria: Optional[str], days: int, since_uid: Optional[int]) -> List[int]:
+        """UIDs of candidate alerts, either above since_uid or from the last `days`"""
+        # Build search query
+        if search_criteria:
+            search_query = search_criteria
+        else:
+            # Search for common bank transaction keywords
+            bank_keywords = [
+                'SUBJECT "debited"',
+                'SUBJECT "credited"',
+                'SUBJECT "transaction"',
+                'SUBJECT "payment"',
+                'SUBJECT "purchase"',
+                'FROM "alerts"',
+                'FROM "bank"'
+            ]
+            search_query = f'OR {" OR ".join(bank_keywords)}'
+
+        if since_uid is not None:
+            search_query = f"UID {since_uid + 1}:* ({search_query})"
+        else:
+            since = (datetime.now() - timedelta(days=days)).strftime("%d-%b-%Y")
+            search_query = f"SINCE {since} ({search_query})"
+
+        # Search emails
+        status, messages = self.imap.uid("SEARCH", None, search_query)
+
+        if status != "OK":
+            return []
+
+        # "n:*" always matches the newest message, even when its UID is <= n
+        return sorted(uid for uid in (int(u) for u in messages[0].split()) if uid > (since_uid or 0))
+
+    def fetch_transactions(
+            self,
+            days: int = 30,
+            search_criteria: str = None,
+            uid_validity: Optional[int] = None,
+            last_uid: int = 0,
+            limit: int = 100
+    ) -> List[Dict]:
+        """Fetch bank transaction emails from inbox.
+
+        With a stored (uid_validity, last_uid) watermark only messages with
+        UID > last_uid are searched. If the mailbox UIDVALIDITY changed the
+        watermark is meaningless and a full resync of the last `days` runs.
+        The new watermark is left on self.uid_validity / self.last_uid.
+        """
         if not self.imap:
             raise Exception("Not connected to email server")
 
         transactions = []
 
         try:
-            # Select inbox
-            self.imap.select("INBOX")
+            current_validity, uid_next = self.select_mailbox("INBOX")
+            incremental = uid_validity is not None and uid_validity == current_validity
+            if not incremental:
+                last_uid = 0
 
-            # Build search query
-            if search_criteria:
-                search_query = search_criteria
-            else:
-                # Search for common bank transaction keywords
-                bank_keywords = [
-                    'SUBJECT "debited"',
-                    'SUBJECT "credited"',
-                    'SUBJECT "transaction"',
-                    'SUBJECT "payment"',
-                    'SUBJECT "purchase"',
-                    'FROM "alerts"',
-                    'FROM "bank"'
-                ]
-                search_query = f'OR {" OR ".join(bank_keywords)}'
-
-            # Search emails
-            status, messages = self.imap.search(None, search_query)
-
-            if status != "OK":
-                return transactions
-
-            email_ids = messages[0].split()
-
-            # Process last N emails (limit to avoid timeout)
-            for email_id in email_ids[-100:]:  # Last 100 emails
-                try:
-                    status, msg_data = self.imap.fetch(email_id, "(RFC822)")
-
-                    if status != "OK":
-                        continue
-
-                    # Parse email
-                    raw_email = msg_data[0][1]
-                    msg = email.message_from_bytes(raw_email)
-
-                    # Get subject
-                    subject = ""
-                    if msg["Subject"]:
-                        subject_parts = decode_header(msg["Subject"])
-                        subject = "".join([
-                            part.decode(encoding or "utf-8") if isinstance(part, bytes) else part
-                            for part, encoding in subject_parts
-                        ])
-
-                    # Get email body
-                    body = ""
-                    if msg.is_multipart():
-                        for part in msg.walk():
-                            if part.get_content_type() == "text/plain":
-                                body = part.get_payload(decode=True).decode()
-                                break
-                    else:
-                        body = msg.get_payload(decode=True).decode()
+            self.uid_validity = current_validity
+            self.last_uid = last_uid
+            self.stats = {"fetch_commands": 0, "bytes_fetched": 0, "headers": 0, "bodies": 0}
+
+            uids = self._search_uids(search_criteria, days, last_uid if incremental else None)
 
-                    # Parse transaction
-                    transaction = self.parse_transaction_from_email(body, subject)
+            truncated = incremental and len(uids) > limit
+            if incremental:
+                # Oldest first, so anything past the limit is picked up by the next sync
+                uids = uids[:limit]
+            else:
+                # Process last N emails (limit to avoid timeout)
+                uids = uids[-limit:]
 
-                    if transaction:
-                        # Add email date
-                        email_date = email.utils.parsedate_to_datetime(msg["Date"])
-                        transaction["date"] = email_date.isoformat()
-                        transactions.append(transaction)
+            # Headers for the whole range, then bodies only for likely alerts
+            for batch in self.iter_alert_batches(uids):
+                transactions.extend(t for t in parse_alert_batch(batch) if t)
 
-                except Exception as e:
-                    continue
+            if uids:
+                self.last_uid = max(self.last_uid, uids[-1])
+            if uid_next and not truncated:
+                # Everything below UIDNEXT has been searched at this point
+                self.last_uid = max(self.last_uid, uid_next - 1)
 
             return transactions
 
         except Exception as e:
             raise Exception(f"Error fetching transactions: {str(e)}")
 
+    def backfill_transactions(
+            self,
+            days: int = 180,
+            search_criteria: str = None,
+            workers: Optional[int] = None,
+            max_in_flight: Optional[int] = None
+    ) -> Iterator[Dict]:
+        """Stream every alert of the last `days`, decoded and parsed in a process pool.
+
+        Raw messages are fetched in batches and handed to worker processes;
+        results are yielded in mailbox order. At most `max_in_flight` batches
+        are queued at once, so a slow consumer stops further IMAP fetches and
+        memory stays bounded however large the mailbox is.
+        """
+        if not self.imap:
+            raise Exception("Not connected to email server")
+
+        self.uid_validity, uid_next = self.select_mailbox("INBOX")
+        self.last_uid = 0
+        self.stats = {"fetch_commands": 0, "bytes_fetched": 0, "headers": 0, "bodies": 0}
+
+        uids = self._search_uids(search_criteria, days, None)
+        workers = workers or os.cpu_count() or 1
+        max_in_flight = max_in_flight or workers * 2
+
+        pending = deque()
+        # spawn keeps workers clear of the server's threads and open sockets
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            for batch in self.iter_alert_batches(uids):
+                pending.append(pool.submit(parse_alert_batch, batch))
+                while len(pending) >= max_in_flight:
+                    yield from (t for t in pending.popleft().result() if t)
+            while pending:
+                yield from (t for t in pending.popleft().result() if t)
+
+        self.last_uid = max(uids[-1] if uids else 0, (uid_next or 1) - 1)
+
+
+def parse_alert(raw_headers: bytes, raw_body: bytes) -> Optional[Dict]:
+    """Decode one fetched alert and parse it into a transaction.
+
+    Module level so it can run in a worker process.
+    """
+    try:
+        msg = email.message_from_bytes(raw_headers)
+        subject = decode_subject(msg["Subject"])
+        body = extract_text(email.message_from_bytes(raw_body))
+
+        # Parse transaction
+        transaction = EmailTransactionParser.parse_transaction_from_email(body, subject)
+
+        if transaction:
+            # Add email date
+            email_date = email.utils.parsedate_to_datetime(msg["Date"])
+            transaction["date"] = email_date.isoformat()
+            transaction["fingerprint"] = transaction_fingerprint(msg, transaction)
+        return transaction
+    except Exception:
+        return None
+
+
+def parse_alert_batch(batch: List[Tuple[bytes, bytes]]) -> List[Optional[Dict]]:
+    return [parse_alert(raw_headers, raw_body) for raw_headers, raw_body in batch]
+
 
 # Gmail-specific helper
 def connect_gmail(email_address: str, app_password: str) -> EmailTransactionParser:
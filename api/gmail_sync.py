@@ -0,0 +1,240 @@
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import models
+from .categorizer import apply_known_categories
+from .data_versions import bump_data_version
+from .email_services import EmailTransactionParser
+from .rollups import RollupRow, apply_rollups, dialect_insert
+
+INSERT_BATCH_SIZE = 500
+
+
+def utc_naive(value: datetime) -> datetime:
+    """The naive UTC datetime transactions.date stores; naive input is taken as UTC already"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def insert_new_transactions(db: Session, rows: List[Dict]) -> List[RollupRow]:
+    """Insert rows in one statement, skipping fingerprints the user already has.
+
+    Returns (amount, type, date) of the rows that were actually inserted.
+    """
+    if not rows:
+        return []
+
+    # Collapse repeats inside the batch itself
+    rows = list({(row["user_id"], row["fingerprint"]): row for row in rows}.values())
+    txn = models.Transaction
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        stmt = dialect_insert(dialect)(txn).values(rows).on_conflict_do_nothing(
+            index_elements=["user_id", "fingerprint"]
+        ).returning(txn.amount, txn.type, txn.date)
+        return [tuple(row) for row in db.execute(stmt)]
+
+    existing = {
+        (user_id, fingerprint) for user_id, fingerprint in db.query(txn.user_id, txn.fingerprint).filter(
+            txn.user_id.in_({row["user_id"] for row in rows}),
+            txn.fingerprint.in_([row["fingerprint"] for row in rows])
+        )
+    }
+    rows = [row for row in rows if (row["user_id"], row["fingerprint"]) not in existing]
+    if rows:
+        db.execute(insert(txn), rows)
+    return [(row["amount"], row["type"], row["date"]) for row in rows]
+
+
+def drop_legacy_duplicates(db: Session, user_id: int, rows: List[Dict],
+                           local_dates: List[datetime]) -> List[Dict]:
+    """Drop rows already stored by a sync from before fingerprints existed.
+
+    Fingerprints hash the alert's headers, so rows imported earlier can't
+    be given one after the fact; instead an incoming alert is skipped when
+    an unfingerprinted row with the same (title, amount, date) is there.
+    Those rows were written from the alert's offset-aware date, which
+    Postgres stored converted to UTC and SQLite as the alert's own wall
+    time, so either counts as the same date. Each stored row absorbs at
+    most one alert.
+    """
+    if not rows:
+        return rows
+
+    txn = models.Transaction
+    # (UTC, wall time) per row, both naive like the stored value
+    candidates = [
+        (row["date"], local.replace(tzinfo=None)) for row, local in zip(rows, local_dates)
+    ]
+    every_date = [date for pair in candidates for date in pair]
+    legacy: Dict[Tuple, int] = {}
+    for title, amount, date in db.query(txn.title, txn.amount, txn.date).filter(
+        txn.user_id == user_id,
+        txn.fingerprint.is_(None),
+        txn.date >= min(every_date),
+        txn.date <= max(every_date),
+        txn.title.in_({row["title"] for row in rows})
+    ):
+        key = (title, round(amount, 2), utc_naive(date))
+        legacy[key] = legacy.get(key, 0) + 1
+    if not legacy:
+        return rows
+
+    kept = []
+    for row, pair in zip(rows, candidates):
+        for date in dict.fromkeys(pair):
+            key = (row["title"], round(row["amount"], 2), date)
+            if legacy.get(key):
+                legacy[key] -= 1
+                break
+        else:
+            kept.append(row)
+    return kept
+
+
+def get_gmail_connection(db: Session, user_id: int, email_address: str) -> models.GmailConnection:
+    """Load the user's sync state, resetting the watermark if the mailbox changed"""
+    connection = db.query(models.GmailConnection).filter(
+        models.GmailConnection.user_id == user_id
+    ).first()
+
+    if connection is None:
+        connection = models.GmailConnection(user_id=user_id, email=email_address, transactions_count=0)
+        db.add(connection)
+    elif connection.email != email_address:
+        connection.email = email_address
+        connection.uid_validity = None
+        connection.last_uid = 0
+
+    return connection
+
+
+def _transaction_row(user_id: int, txn_data: Dict, date: datetime) -> Dict:
+    return {
+        "user_id": user_id,
+        "title": txn_data["title"],
+        "amount": txn_data["amount"],
+        "type": txn_data["type"],
+        "category": txn_data["category"],
+        "bank": txn_data["bank"],
+        "date": utc_naive(date),
+        "fingerprint": txn_data["fingerprint"],
+        "created_at": datetime.utcnow()
+    }
+
+
+def store_transactions(
+        db: Session,
+        user_id: int,
+        email_transactions: Iterable[Dict],
+        on_batch: Optional[Callable[[int, int], None]] = None
+) -> Tuple[int, int]:
+    """Insert parsed alerts batch by batch; returns (found, inserted).
+
+    Accepts a generator, so a backfill is written as it streams in. Each
+    batch commits with its rollups; fingerprints make a retry after a
+    partial failure safe.
+    """
+    found = inserted = 0
+    batch: List[Dict] = []
+    local_dates: List[datetime] = []
+
+    def flush():
+        nonlocal inserted
+        # Merchants the LLM already categorized beat the keyword guess
+        apply_known_categories(db, batch)
+        # Duplicates are dropped by the fingerprint index, and alerts stored
+        # before fingerprints existed by their (title, amount, date)
+        new_rows = insert_new_transactions(db, drop_legacy_duplicates(db, user_id, batch, local_dates))
+        apply_rollups(db, user_id, new_rows)
+        if new_rows:
+            bump_data_version(db, user_id)
+        db.commit()
+        batch.clear()
+        local_dates.clear()
+        inserted += len(new_rows)
+        if on_batch:
+            on_batch(found, inserted)
+
+    for txn_data in email_transactions:
+        found += 1
+        local_dates.append(datetime.fromisoformat(txn_data["date"]))
+        batch.append(_transaction_row(user_id, txn_data, local_dates[-1]))
+        if len(batch) >= INSERT_BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+
+    return found, inserted
+
+
+def sync_gmail(
+        db: Session,
+        user_id: int,
+        email_address: str,
+        app_password: str,
+        days: int = 30,
+        backfill_days: Optional[int] = None,
+        progress: Optional[Callable[..., None]] = None
+) -> Dict:
+    """Pull new bank alerts from the mailbox and store them as transactions.
+
+    backfill_days switches to a full backfill of that many days, parsed
+    in a process pool and streamed straight into the database. progress,
+    if given, is called as progress(phase, **counts) along the way.
+    """
+    def report(phase: str, **counts):
+        if progress:
+            progress(phase, **counts)
+
+    connection = get_gmail_connection(db, user_id, email_address)
+
+    parser = EmailTransactionParser(email_address, app_password)
+    report("connecting")
+    parser.connect("imap.gmail.com")
+    try:
+        report("fetching")
+        if backfill_days:
+            email_transactions = parser.backfill_transactions(days=backfill_days)
+        else:
+            # Fetch transactions from emails newer than the stored watermark
+            email_transactions = parser.fetch_transactions(
+                days=days,
+                uid_validity=connection.uid_validity,
+                last_uid=connection.last_uid or 0
+            )
+
+        # Save to database
+        report("saving", messages_scanned=parser.stats["headers"])
+        found, inserted = store_transactions(
+            db,
+            user_id,
+            email_transactions,
+            on_batch=lambda found, inserted: report(
+                "saving",
+                messages_scanned=parser.stats["headers"],
+                transactions_found=found,
+                new_transactions=inserted
+            )
+        )
+    finally:
+        parser.disconnect()
+
+    connection.uid_validity = parser.uid_validity
+    connection.last_uid = parser.last_uid
+    connection.last_synced = datetime.utcnow()
+    connection.transactions_count = (connection.transactions_count or 0) + inserted
+    # Sync status is part of the dashboard bundle
+    bump_data_version(db, user_id)
+    db.commit()
+
+    return {
+        "message": "Sync completed",
+        "total_found": found,
+        "new_transactions": inserted
+    }
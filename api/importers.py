@@ -0,0 +1,191 @@
+"""Streaming CSV/OFX statement import.
+
+Files are parsed record by record and written in fixed-size batches, so
+memory stays flat however large the upload is.
+"""
+import codecs
+import csv
+import io
+import re
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from . import models, schemas
+from .rollups import apply_rollups
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 20
+
+IMPORT_COLUMNS = ("title", "category", "amount", "date", "type", "bank", "description")
+
+_OFX_TOKEN = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+_OFX_INCOME_TYPES = {"CREDIT", "DEP", "DIRECTDEP", "INT", "DIV"}
+# Bank exports often say debit/credit where the app says expense/income
+_TYPE_ALIASES = {"expense": "expense", "income": "income", "debit": "expense", "credit": "income"}
+
+
+def iter_csv_records(stream: BinaryIO) -> Iterator[Dict]:
+    """Yield one dict per CSV row, keyed by lower-cased header"""
+    reader = csv.DictReader(codecs.iterdecode(stream, "utf-8-sig"))
+    for row in reader:
+        yield {
+            key.strip().lower(): value.strip() if isinstance(value, str) else value
+            for key, value in row.items() if key
+        }
+
+
+def _parse_ofx_date(value: str) -> Optional[str]:
+    # OFX dates look like 20240131120000.000[-5:EST]
+    digits = re.match(r"\d{8}(\d{6})?", value or "")
+    if not digits:
+        return None
+    stamp = digits.group(0).ljust(14, "0")
+    return datetime.strptime(stamp, "%Y%m%d%H%M%S").isoformat()
+
+
+def _ofx_record(fields: Dict[str, str]) -> Dict:
+    amount = fields.get("TRNAMT", "")
+    txn_type = fields.get("TRNTYPE", "").upper()
+    if txn_type in _OFX_INCOME_TYPES:
+        kind = "income"
+    elif txn_type or amount:
+        kind = "expense" if amount.startswith("-") else "income"
+    else:
+        kind = ""
+    return {
+        "title": fields.get("NAME") or fields.get("PAYEE") or fields.get("MEMO", ""),
+        "amount": amount,
+        "date": _parse_ofx_date(fields.get("DTPOSTED", "")),
+        "type": kind,
+        "description": fields.get("MEMO"),
+    }
+
+
+def iter_ofx_records(stream: BinaryIO, read_size: int = 64 * 1024) -> Iterator[Dict]:
+    """Yield one dict per <STMTTRN> block of an OFX 1.x (SGML) or 2.x (XML) file"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    current: Optional[Dict[str, str]] = None
+
+    while True:
+        chunk = stream.read(read_size)
+        buffer += decoder.decode(chunk or b"", final=not chunk)
+
+        # Only consume tokens that are known to be complete
+        end = len(buffer) if not chunk else buffer.rfind("<")
+        pos = 0
+        for match in _OFX_TOKEN.finditer(buffer, 0, max(end, 0)):
+            closing, tag, value = match.groups()
+            tag = tag.upper()
+            if tag == "STMTTRN":
+                if closing and current is not None:
+                    yield _ofx_record(current)
+                    current = None
+                elif not closing:
+                    current = {}
+            elif current is not None and not closing and value.strip():
+                current[tag] = value.strip()
+            pos = match.end()
+        buffer = buffer[pos:]
+
+        if not chunk:
+            break
+
+
+def _normalize(record: Dict) -> Dict:
+    fields = {key: record.get(key) or None for key in IMPORT_COLUMNS}
+
+    amount = fields["amount"]
+    if isinstance(amount, str):
+        fields["amount"] = amount.replace(",", "").replace("$", "")
+
+    if fields["type"]:
+        kind = _TYPE_ALIASES.get(fields["type"].lower())
+        if kind is None:
+            raise ValueError(f"Unknown transaction type {fields['type']!r}; use income or expense")
+        fields["type"] = kind
+    elif fields["amount"] is not None:
+        fields["type"] = "expense" if str(fields["amount"]).startswith("-") else "income"
+
+    date = fields["date"]
+    if isinstance(date, str) and len(date) == 10:
+        fields["date"] = f"{date}T00:00:00"
+
+    fields["category"] = fields["category"] or "Other"
+    fields["title"] = fields["title"] or fields["description"]
+    return fields
+
+
+def _copy_batch(db: Session, batch: List[Dict]):
+    """Stream a batch through COPY ... FROM STDIN on the session's own connection"""
+    columns = ("user_id", "created_at") + IMPORT_COLUMNS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in batch:
+        writer.writerow([
+            row[column].isoformat() if isinstance(row[column], datetime) else row[column]
+            for column in columns
+        ])
+    buffer.seek(0)
+
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {models.Transaction.__tablename__} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _insert_batch(db: Session, user_id: int, batch: List[Dict]):
+    if db.get_bind().dialect.driver == "psycopg2":
+        _copy_batch(db, batch)
+    else:
+        # insertmanyvalues turns this into multi-row INSERT statements
+        db.execute(insert(models.Transaction), batch)
+    apply_rollups(db, user_id, [(row["amount"], row["type"], row["date"]) for row in batch])
+    batch.clear()
+
+
+def import_records(db: Session, user_id: int, records: Iterator[Dict], chunk_size: int = CHUNK_SIZE) -> Dict:
+    """Validate and insert records in batches; the caller commits.
+
+    Blank records are skipped, invalid ones are counted as failed and the
+    first few errors are reported with their record number.
+    """
+    summary = {"inserted": 0, "skipped": 0, "failed": 0, "errors": []}
+    batch: List[Dict] = []
+
+    for number, record in enumerate(records, start=1):
+        if not any(value not in (None, "") for value in record.values()):
+            summary["skipped"] += 1
+            continue
+
+        try:
+            transaction = schemas.TransactionCreate(**_normalize(record))
+        except (ValidationError, ValueError) as e:
+            summary["failed"] += 1
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append({"record": number, "error": str(e)})
+            continue
+
+        row = transaction.dict()
+        row["user_id"] = user_id
+        row["date"] = row["date"] or datetime.utcnow()
+        row["created_at"] = datetime.utcnow()
+        batch.append(row)
+
+        if len(batch) >= chunk_size:
+            summary["inserted"] += len(batch)
+            _insert_batch(db, user_id, batch)
+
+    if batch:
+        summary["inserted"] += len(batch)
+        _insert_batch(db, user_id, batch)
+
+    return summary
@@ -0,0 +1,153 @@
+"""In-process background worker for Gmail sync jobs.
+
+A sync request only records a job row and hands the work to a small
+thread pool that outlives the request; clients poll the row for phase,
+counts and errors. Credentials are passed to the worker in memory and
+never stored with the job.
+
+A unique index on active_user_id, which holds the user id until the job
+finishes, allows one queued or running job per user, so concurrent
+requests in different processes coalesce on the same row. A
+worker claims its job by moving it from queued to running and skips it
+if anything else (the stale check, another worker) got there first.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+from .gmail_sync import sync_gmail
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+# A job this long without progress belongs to a worker that died
+STALE_AFTER = timedelta(seconds=int(os.getenv("SYNC_JOB_STALE_SECONDS", "900")))
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SYNC_WORKERS", "2")),
+    thread_name_prefix="gmail-sync"
+)
+_enqueue_lock = threading.Lock()
+# Jobs waiting in this process's executor; they aren't stale, just queued
+_queued_here = set()
+
+
+def _update_job(job_id: int, **fields):
+    """Write job progress in its own short transaction; best effort"""
+    db = SessionLocal()
+    try:
+        db.query(models.SyncJob).filter(models.SyncJob.id == job_id).update(
+            {**fields, "updated_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+    except Exception:
+        db.rollback()
+        logger.exception("Failed to update sync job %s", job_id)
+    finally:
+        db.close()
+
+
+def _finish_job(job_id: int, **fields):
+    """Record the outcome and release the user's active-job slot"""
+    _update_job(job_id, active_user_id=None, finished_at=datetime.utcnow(), **fields)
+
+
+def _claim_job(job_id: int) -> bool:
+    """Move the job from queued to running; False if it was failed or claimed meanwhile"""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        claimed = db.query(models.SyncJob).filter(
+            models.SyncJob.id == job_id,
+            models.SyncJob.status == "queued"
+        ).update(
+            {"status": "running", "phase": "connecting", "started_at": now, "updated_at": now},
+            synchronize_session=False
+        )
+        db.commit()
+        return claimed == 1
+    finally:
+        db.close()
+
+
+def _run_gmail_sync(job_id: int, user_id: int, email_address: str, app_password: str,
+                    backfill_days: Optional[int]):
+    with _enqueue_lock:
+        _queued_here.discard(job_id)
+    if not _claim_job(job_id):
+        logger.info("Skipping sync job %s; it is no longer queued", job_id)
+        return
+
+    db = SessionLocal()
+    try:
+        result = sync_gmail(
+            db,
+            user_id,
+            email_address,
+            app_password,
+            backfill_days=backfill_days,
+            progress=lambda phase, **counts: _update_job(job_id, phase=phase, **counts)
+        )
+        _finish_job(
+            job_id,
+            status="succeeded",
+            phase="done",
+            transactions_found=result["total_found"],
+            new_transactions=result["new_transactions"]
+        )
+    except Exception as e:
+        db.rollback()
+        _finish_job(job_id, status="failed", error=str(e))
+    finally:
+        db.close()
+
+
+def get_active_job(db: Session, user_id: int) -> Optional[models.SyncJob]:
+    """The user's queued or running job, failing it first if it went stale"""
+    job = db.query(models.SyncJob).filter(
+        models.SyncJob.user_id == user_id,
+        models.SyncJob.status.in_(ACTIVE_STATUSES)
+    ).order_by(models.SyncJob.id.desc()).first()
+
+    if job and job.id not in _queued_here and datetime.utcnow() - (job.updated_at or job.created_at) > STALE_AFTER:
+        job.status = "failed"
+        job.active_user_id = None
+        job.error = "Sync worker stopped responding"
+        job.finished_at = datetime.utcnow()
+        db.commit()
+        return None
+    return job
+
+
+def enqueue_gmail_sync(db: Session, user_id: int, email_address: str, app_password: str,
+                       backfill_days: Optional[int] = None) -> models.SyncJob:
+    """Start a sync job, or return the one already in flight for this user"""
+    with _enqueue_lock:
+        job = get_active_job(db, user_id)
+        if job:
+            return job
+
+        job = models.SyncJob(user_id=user_id, active_user_id=user_id, status="queued", phase="queued",
+                             backfill_days=backfill_days)
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another process enqueued one first; coalesce onto it
+            db.rollback()
+            return get_active_job(db, user_id)
+        db.refresh(job)
+        _queued_here.add(job.id)
+
+    _executor.submit(_run_gmail_sync, job.id, user_id, email_address, app_password, backfill_days)
+    return job
@@ -0,0 +1,133 @@
+"""Admission control for outbound LLM calls.
+
+Identical in-flight requests (same user, query and context) share one
+upstream call; everything else is charged against a per-user token bucket
+and waits for one of a fixed number of global slots.
+
+    AI_USER_RATE_PER_MINUTE  sustained calls per user (default 10)
+    AI_USER_BURST            calls a user may make back to back (default 5)
+    AI_MAX_CONCURRENCY       upstream calls in flight per process (default 8)
+    AI_QUEUE_TIMEOUT         seconds to wait for a free slot (default 10)
+"""
+import asyncio
+import math
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+MAX_TRACKED_USERS = 10000
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f"Too many AI requests, retry in {math.ceil(retry_after)}s")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate  # tokens per second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Spend one token; returns 0, or the seconds until one is available"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def full(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+def _retrieve(future: asyncio.Future):
+    # Joiners may all have gone away; don't log the error as unretrieved
+    if not future.cancelled():
+        future.exception()
+
+
+class LLMGate:
+    def __init__(self, rate_per_minute: float, burst: int, max_concurrency: int, queue_timeout: float):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.queue_timeout = queue_timeout
+        self._buckets: Dict[int, TokenBucket] = {}
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    def take_token(self, user_id: int):
+        """Charge one call to the user's bucket or raise RateLimited"""
+        if len(self._buckets) > MAX_TRACKED_USERS:
+            self._buckets = {uid: b for uid, b in self._buckets.items() if not b.full()}
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.rate, self.burst)
+        wait = bucket.take()
+        if wait:
+            raise RateLimited(wait)
+
+    async def acquire_slot(self):
+        """Wait for a global slot; raise RateLimited if none frees up in time"""
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise RateLimited(self.queue_timeout)
+
+    def release_slot(self):
+        self._slots.release()
+
+    async def acquire(self, user_id: int):
+        self.take_token(user_id)
+        await self.acquire_slot()
+
+    def in_flight(self, key: str) -> Optional[asyncio.Future]:
+        return self._in_flight.get(key)
+
+    def publish(self, key: str) -> asyncio.Future:
+        """Register a call made outside run() (e.g. a stream) so duplicates can join it"""
+        future = asyncio.get_running_loop().create_future()
+        self._track(key, future)
+        return future
+
+    def _track(self, key: str, future: asyncio.Future):
+        self._in_flight[key] = future
+        future.add_done_callback(_retrieve)
+        future.add_done_callback(lambda done: self._forget(key, done))
+
+    def _forget(self, key: str, future: asyncio.Future):
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+
+    async def _guarded(self, call: Callable[[], Awaitable]):
+        await self.acquire_slot()
+        try:
+            return await call()
+        finally:
+            self.release_slot()
+
+    async def run(self, user_id: int, key: str, call: Callable[[], Awaitable]):
+        """Run call() once for every concurrent request with the same key"""
+        shared = self._in_flight.get(key)
+        if shared is None:
+            self.take_token(user_id)
+            # A task, so one caller going away doesn't cancel it for the others
+            shared = asyncio.ensure_future(self._guarded(call))
+            self._track(key, shared)
+        return await asyncio.shield(shared)
+
+
+def create_llm_gate() -> LLMGate:
+    return LLMGate(
+        rate_per_minute=float(os.getenv("AI_USER_RATE_PER_MINUTE", "10")),
+        burst=int(os.getenv("AI_USER_BURST", "5")),
+        max_concurrency=int(os.getenv("AI_MAX_CONCURRENCY", "8")),
+        queue_timeout=float(os.getenv("AI_QUEUE_TIMEOUT", "10"))
+    )
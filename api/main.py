@@ -1,28 +1,72 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from typing import List, Optional
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING, List, Optional
+import asyncio
+import csv
+import json
 import jwt
-from passlib.context import CryptContext
 import os
 
-from .database import get_db, engine
+from .database import ReadSessionLocal, dispose_async_engine, get_async_db, get_db, pool_metrics
 from . import models, schemas
+from .rollups import apply_rollups
+from .analytics import spending_by_category
+from .dashboard import RECENT_TRANSACTIONS, load_dashboard, load_gmail_status, load_stats, parse_fields
+from .pagination import after_cursor, encode_cursor
+from .importers import import_records, iter_csv_records, iter_ofx_records
 from .ai_service import GrokAIService
+from .advice_cache import advice_key, create_advice_cache
+from .advice_context import load_advice_summary, render_advice_context
+from .llm_gate import RateLimited, create_llm_gate
+from .categorizer import UNCATEGORIZED, lookup_category
 from .email_services import EmailTransactionParser, connect_gmail
+from .jobs import enqueue_gmail_sync
+from .data_versions import bump_data_version, data_etag, etag_matches, get_data_version
+from .principals import Principal, load_principal, revoke_tokens
+from .passwords import PasswordHashingBusy, hash_password, verify_password
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Schema changes run via `python -m api.migrate`, not on import; the
+# engine and the AI service are created on first use, keeping cold starts
+# free of network round trips
+_ai_service: Optional[GrokAIService] = None
+
+
+def get_ai_service() -> GrokAIService:
+    global _ai_service
+    if _ai_service is None:
+        _ai_service = GrokAIService()
+    return _ai_service
+
+
+advice_cache = create_advice_cache()
+llm_gate = create_llm_gate()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # The LLM client and async engine only exist if a request needed them
+    if _ai_service is not None:
+        await _ai_service.aclose()
+    await dispose_async_engine()
 
-# Initialize Grok AI Service
-ai_service = GrokAIService()
 
 app = FastAPI(
     title="FinanceAI API",
     description="Backend for Insightful Finance AI - Powered by xAI Grok",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS Configuration
@@ -32,48 +76,93 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Advice-Cache", "Retry-After", "ETag"],
 )
 
+
+@app.exception_handler(RateLimited)
+def rate_limited_handler(request: Request, exc: RateLimited):
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(PasswordHashingBusy)
+def password_hashing_busy_handler(request: Request, exc: PasswordHashingBusy):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
 # Security
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/token")
 
 
 # Helper Functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
-
-def create_access_token(data: dict):
-    to_encode = data.copy()
+def create_access_token(user: models.User):
+    # Only what auth needs: who, and which token_version the token belongs to
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    to_encode = {"sub": str(user.id), "ver": user.token_version or 0, "exp": expire}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except jwt.PyJWTError:
+        user_id = int(payload["sub"])
+        token_version = int(payload.get("ver", 0))
+    except (jwt.PyJWTError, KeyError, TypeError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    # Served from the principal cache; users is only read on a miss
+    principal = load_principal(db, user_id, token_version)
+    if principal is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    return principal
+
+
+def get_current_user_record(
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_db)
+) -> models.User:
+    """The full users row, for the few handlers that read or change it"""
+    user = db.query(models.User).filter(models.User.id == current_user.id).first()
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return user
 
 
+def get_read_db(current_user: Principal = Depends(get_current_user)):
+    """Read-only session for listing and analytics; see ReadSessionLocal"""
+    db = ReadSessionLocal(current_user.id)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def not_modified(request: Request, response: Response, db: Session, user_id: int) -> Optional[Response]:
+    """Tag the response with the user's data version; a 304 if the client has it"""
+    headers = {
+        "ETag": data_etag(user_id, get_data_version(db, user_id)),
+        # Browsers revalidate every time, and shared caches never store it
+        "Cache-Control": "private, no-cache",
+        "Vary": "Authorization",
+    }
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
 # Routes
 @app.get("/")
 def root():
@@ -85,32 +174,58 @@ def health_check():
     return {"status": "healthy", "ai_provider": "xAI Grok", "model": "grok-beta"}
 
 
+@app.get("/api/health/db-pool")
+def db_pool_health():
+    """Checked-out, overflow and checkout-wait counters for the connection pools"""
+    return pool_metrics()
+
+
+@app.get("/api/health/advice-cache")
+def advice_cache_health():
+    """Process-wide advice cache counters; ops-facing like db-pool, not part of the user API"""
+    return advice_cache.stats()
+
+
 # Authentication
+# Async so bcrypt waits on its own executor (see passwords.py), not on a
+# threadpool worker that sync endpoints need
 @app.post("/api/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.email == user.email).first()
+async def register(user: schemas.UserCreate, db: "AsyncSession" = Depends(get_async_db)):
+    db_user = (await db.execute(
+        select(models.User.id).filter(models.User.email == user.email)
+    )).first()
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
     new_user = models.User(
         email=user.email,
         name=user.name,
         hashed_password=hashed_password
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
 
 @app.post("/api/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: "AsyncSession" = Depends(get_async_db)):
+    user = (await db.execute(
+        select(models.User).filter(models.User.email == form_data.username)
+    )).scalars().first()
+    if not user:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
 
-    access_token = create_access_token(data={"sub": user.id})
+    valid, new_hash = await verify_password(form_data.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if new_hash:
+        # Cost factor or scheme changed since this hash was made
+        user.hashed_password = new_hash
+        await db.commit()
+
+    access_token = create_access_token(user)
     return {
         "access_token": access_token,
         "token_type": "bearer",
@@ -118,63 +233,156 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     }
 
 
+@app.post("/api/password")
+async def change_password(
+        change: schemas.PasswordChange,
+        current_user: Principal = Depends(get_current_user),
+        db: "AsyncSession" = Depends(get_async_db)
+):
+    user = await db.get(models.User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    valid, _ = await verify_password(change.current_password, user.hashed_password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Incorrect password")
+
+    user.hashed_password = await hash_password(change.new_password)
+    # Signs out every other session
+    revoke_tokens(db, user)
+    await db.commit()
+
+    return {"access_token": create_access_token(user), "token_type": "bearer"}
+
+
 # Dashboard Stats
 @app.get("/api/dashboard/stats")
 def get_dashboard_stats(
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        request: Request,
+        response: Response,
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
 ):
-    transactions = db.query(models.Transaction).filter(
-        models.Transaction.user_id == current_user.id
-    ).all()
+    cached = not_modified(request, response, db, current_user.id)
+    if cached:
+        return cached
 
-    total_income = sum(t.amount for t in transactions if t.type == "income")
-    total_expenses = sum(abs(t.amount) for t in transactions if t.type == "expense")
-    total_balance = total_income - total_expenses
-    savings_rate = (total_balance / total_income * 100) if total_income > 0 else 0
+    return load_stats(db, current_user.id)
 
-    return {
-        "total_balance": total_balance,
-        "monthly_income": total_income,
-        "monthly_expenses": total_expenses,
-        "savings_rate": round(savings_rate, 1)
-    }
+
+@app.get("/api/dashboard", response_model=schemas.DashboardBundle, response_model_exclude_unset=True)
+async def get_dashboard_bundle(
+        request: Request,
+        response: Response,
+        fields: Optional[str] = None,
+        limit: int = Query(RECENT_TRANSACTIONS, ge=1, le=100),
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
+):
+    """Any of stats, transactions, goals, spending and gmail in one round trip"""
+    try:
+        names = parse_fields(fields or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    cached = await run_in_threadpool(not_modified, request, response, db, current_user.id)
+    if cached:
+        return cached
+
+    return await load_dashboard(db, current_user.id, names, limit)
 
 
 # Transactions
 @app.get("/api/transactions", response_model=List[schemas.TransactionResponse])
 def get_transactions(
+        request: Request,
+        response: Response,
         skip: int = 0,
-        limit: int = 50,
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        limit: int = Query(50, ge=1, le=500),
+        cursor: Optional[str] = None,
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
 ):
-    transactions = db.query(models.Transaction).filter(
+    cached = not_modified(request, response, db, current_user.id)
+    if cached:
+        return cached
+
+    query = db.query(models.Transaction).filter(
         models.Transaction.user_id == current_user.id
-    ).order_by(models.Transaction.date.desc()).offset(skip).limit(limit).all()
+    ).order_by(models.Transaction.date.desc(), models.Transaction.id.desc())
+
+    # Legacy offset paging; cursor paging below is constant-time at any depth
+    if skip and not cursor:
+        return query.offset(skip).limit(limit).all()
+
+    if cursor:
+        try:
+            query = query.filter(after_cursor(models.Transaction.date, models.Transaction.id, cursor))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    transactions = query.limit(limit + 1).all()
+    if len(transactions) > limit:
+        transactions = transactions[:limit]
+        last = transactions[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.date, last.id)
     return transactions
 
 
 @app.post("/api/transactions", response_model=schemas.TransactionResponse)
 def create_transaction(
         transaction: schemas.TransactionCreate,
-        current_user: models.User = Depends(get_current_user),
+        current_user: Principal = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
     new_transaction = models.Transaction(
         **transaction.dict(),
         user_id=current_user.id
     )
+    # Fill in "Other" from the merchant memo when the merchant is known
+    if new_transaction.category in ("", UNCATEGORIZED):
+        new_transaction.category = lookup_category(db, new_transaction.title) or UNCATEGORIZED
     db.add(new_transaction)
+    db.flush()
+    apply_rollups(db, current_user.id, [
+        (new_transaction.amount, new_transaction.type, new_transaction.date)
+    ])
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(new_transaction)
     return new_transaction
 
 
+@app.post("/api/transactions/import")
+def import_transactions(
+        file: UploadFile = File(...),
+        format: Optional[str] = Query(None, pattern="^(csv|ofx)$"),
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    if format is None:
+        filename = (file.filename or "").lower()
+        format = "ofx" if filename.endswith((".ofx", ".qfx")) else "csv"
+
+    records = iter_ofx_records(file.file) if format == "ofx" else iter_csv_records(file.file)
+    try:
+        summary = import_records(db, current_user.id, records)
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    except csv.Error as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Malformed CSV: {e}")
+
+    bump_data_version(db, current_user.id)
+    db.commit()
+    return summary
+
+
 @app.delete("/api/transactions/{transaction_id}")
 def delete_transaction(
         transaction_id: int,
-        current_user: models.User = Depends(get_current_user),
+        current_user: Principal = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
     db_transaction = db.query(models.Transaction).filter(
@@ -185,7 +393,11 @@ def delete_transaction(
     if not db_transaction:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
+    apply_rollups(db, current_user.id, [
+        (db_transaction.amount, db_transaction.type, db_transaction.date)
+    ], sign=-1)
     db.delete(db_transaction)
+    bump_data_version(db, current_user.id)
     db.commit()
     return {"message": "Transaction deleted"}
 
@@ -193,9 +405,15 @@ def delete_transaction(
 # Goals
 @app.get("/api/goals", response_model=List[schemas.GoalResponse])
 def get_goals(
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        request: Request,
+        response: Response,
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
 ):
+    cached = not_modified(request, response, db, current_user.id)
+    if cached:
+        return cached
+
     goals = db.query(models.Goal).filter(
         models.Goal.user_id == current_user.id
     ).all()
@@ -205,7 +423,7 @@ def get_goals(
 @app.post("/api/goals", response_model=schemas.GoalResponse)
 def create_goal(
         goal: schemas.GoalCreate,
-        current_user: models.User = Depends(get_current_user),
+        current_user: Principal = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
     new_goal = models.Goal(
@@ -213,6 +431,7 @@ def create_goal(
         user_id=current_user.id
     )
     db.add(new_goal)
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(new_goal)
     return new_goal
@@ -221,7 +440,7 @@ def create_goal(
 @app.delete("/api/goals/{goal_id}")
 def delete_goal(
         goal_id: int,
-        current_user: models.User = Depends(get_current_user),
+        current_user: Principal = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
     db_goal = db.query(models.Goal).filter(
@@ -233,6 +452,7 @@ def delete_goal(
         raise HTTPException(status_code=404, detail="Goal not found")
 
     db.delete(db_goal)
+    bump_data_version(db, current_user.id)
     db.commit()
     return {"message": "Goal deleted"}
 
@@ -240,89 +460,142 @@ def delete_goal(
 # Analytics
 @app.get("/api/analytics/spending")
 def get_spending_analytics(
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        request: Request,
+        response: Response,
+        start: Optional[date] = Query(None, alias="from"),
+        end: Optional[date] = Query(None, alias="to"),
+        granularity: Optional[str] = Query(None, pattern="^(day|week|month|year)$"),
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_read_db)
 ):
-    transactions = db.query(models.Transaction).filter(
-        models.Transaction.user_id == current_user.id,
-        models.Transaction.type == "expense"
-    ).all()
-
-    categories = {}
-    for txn in transactions:
-        category = txn.category
-        categories[category] = categories.get(category, 0) + abs(txn.amount)
+    cached = not_modified(request, response, db, current_user.id)
+    if cached:
+        return cached
+
+    # Both bounds are inclusive calendar days
+    return spending_by_category(
+        db,
+        current_user.id,
+        start=datetime.combine(start, time.min) if start else None,
+        end=datetime.combine(end + timedelta(days=1), time.min) if end else None,
+        granularity=granularity
+    )
 
-    spending_data = [
-        {"name": cat, "value": amt} for cat, amt in categories.items()
-    ]
 
-    return {"data": spending_data, "total": sum(categories.values())}
+# AI Advisor
+async def build_advice_context(db: "AsyncSession", user_id: int) -> str:
+    # Aggregated in SQL over the user's whole history, trimmed to the token budget
+    summary = await load_advice_summary(db, user_id)
+    return render_advice_context(summary)
 
 
-# AI Advisor
 @app.post("/api/ai/advice")
 async def get_ai_advice(
         query: schemas.AIQuery,
-        current_user: models.User = Depends(get_current_user),
-        db: Session = Depends(get_db)
+        response: Response,
+        current_user: Principal = Depends(get_current_user),
+        db: "AsyncSession" = Depends(get_async_db)
 ):
-    # Get user data
-    transactions = db.query(models.Transaction).filter(
-        models.Transaction.user_id == current_user.id
-    ).order_by(models.Transaction.date.desc()).limit(50).all()
+    # Same question against unchanged data: reuse the previous answer
+    context = await build_advice_context(db, current_user.id)
+    cache_key = advice_key(current_user.id, query.query, context)
+    advice = await advice_cache.aget(cache_key)
+    response.headers["X-Advice-Cache"] = "hit" if advice is not None else "miss"
+
+    if advice is None:
+        # Duplicate in-flight requests share this call; see llm_gate
+        advice = await llm_gate.run(
+            current_user.id,
+            cache_key,
+            lambda: get_ai_service().get_financial_advice(user_query=query.query, context=context)
+        )
+        await advice_cache.aset(cache_key, advice)
 
-    goals = db.query(models.Goal).filter(
-        models.Goal.user_id == current_user.id
-    ).all()
+    return {"advice": advice}
 
-    # Get stats
-    total_income = sum(t.amount for t in transactions if t.type == "income")
-    total_expenses = sum(abs(t.amount) for t in transactions if t.type == "expense")
-    total_balance = total_income - total_expenses
-    savings_rate = (total_balance / total_income * 100) if total_income > 0 else 0
-
-    stats = {
-        "total_balance": total_balance,
-        "monthly_income": total_income,
-        "monthly_expenses": total_expenses,
-        "savings_rate": savings_rate
-    }
 
-    # Convert to dict
-    transactions_dict = [
-        {
-            "title": t.title,
-            "amount": t.amount,
-            "category": t.category,
-            "type": t.type
-        } for t in transactions
-    ]
-
-    goals_dict = [
-        {
-            "title": g.title,
-            "target": g.target,
-            "current": g.current
-        } for g in goals
-    ]
-
-    # Get AI advice
-    advice = await ai_service.get_financial_advice(
-        user_query=query.query,
-        transactions=transactions_dict,
-        goals=goals_dict,
-        stats=stats
-    )
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
-    return {"advice": advice}
+
+@app.post("/api/ai/advice/stream")
+async def stream_ai_advice(
+        query: schemas.AIQuery,
+        request: Request,
+        current_user: Principal = Depends(get_current_user),
+        db: "AsyncSession" = Depends(get_async_db)
+):
+    context = await build_advice_context(db, current_user.id)
+    cache_key = advice_key(current_user.id, query.query, context)
+    cached = await advice_cache.aget(cache_key)
+    shared = llm_gate.in_flight(cache_key) if cached is None else None
+    published = None
+
+    if cached is None and shared is None:
+        ai_service = get_ai_service()
+        # Raises RateLimited (429) before any of the stream is sent
+        await llm_gate.acquire(current_user.id)
+        published = llm_gate.publish(cache_key)
+
+    async def events():
+        if cached is not None:
+            yield sse_event({"token": cached})
+            yield sse_event({"cached": True}, event="done")
+            return
+
+        if shared is not None:
+            # An identical request is already generating; wait for its answer
+            try:
+                advice = await asyncio.shield(shared)
+            except Exception as e:
+                yield sse_event({"detail": str(e)}, event="error")
+                return
+            yield sse_event({"token": advice})
+            yield sse_event({"cached": False}, event="done")
+            return
+
+        tokens = []
+        stream = ai_service.stream_financial_advice(query.query, context)
+        try:
+            async for token in stream:
+                # Stop generating (and paying for) tokens nobody will read
+                if await request.is_disconnected():
+                    return
+                tokens.append(token)
+                yield sse_event({"token": token})
+        except Exception as e:
+            published.set_exception(e)
+            yield sse_event({"detail": str(e)}, event="error")
+            return
+        finally:
+            await stream.aclose()
+
+        advice = "".join(tokens)
+        published.set_result(advice)
+        await advice_cache.aset(cache_key, advice)
+        yield sse_event({"cached": False}, event="done")
+
+    def finish():
+        # Runs after the response, even if the client went away mid-stream
+        if published is not None:
+            if not published.done():
+                published.set_exception(Exception("Advice stream was interrupted"))
+            llm_gate.release_slot()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(finish)
+    )
 
 
 # Gmail/IMAP Integration
 @app.post("/api/gmail/connect")
 def connect_gmail(
         credentials: schemas.GmailCredentials,
-        current_user: models.User = Depends(get_current_user),
+        current_user: models.User = Depends(get_current_user_record),
         db: Session = Depends(get_db)
 ):
     try:
@@ -333,6 +606,7 @@ def connect_gmail(
         # Store encrypted credentials (implement encryption in production)
         current_user.gmail_email = credentials.email
         current_user.gmail_connected = True
+        bump_data_version(db, current_user.id)
         db.commit()
 
         return {"message": "Gmail connected successfully", "email": credentials.email}
@@ -340,60 +614,41 @@ def connect_gmail(
         raise HTTPException(status_code=400, detail=str(e))
 
 
-@app.post("/api/gmail/sync")
+@app.post("/api/gmail/sync", response_model=schemas.SyncJobResponse, status_code=status.HTTP_202_ACCEPTED)
 def sync_gmail_transactions(
         credentials: schemas.GmailCredentials,
-        current_user: models.User = Depends(get_current_user),
+        current_user: Principal = Depends(get_current_user),
         db: Session = Depends(get_db)
 ):
-    try:
-        parser = EmailTransactionParser(credentials.email, credentials.app_password)
-        parser.connect("imap.gmail.com")
-
-        # Fetch transactions from emails
-        email_transactions = parser.fetch_transactions(days=30)
-        parser.disconnect()
-
-        # Save to database
-        new_count = 0
-        for txn_data in email_transactions:
-            # Check if transaction already exists
-            existing = db.query(models.Transaction).filter(
-                models.Transaction.user_id == current_user.id,
-                models.Transaction.title == txn_data["title"],
-                models.Transaction.amount == txn_data["amount"]
-            ).first()
-
-            if not existing:
-                new_transaction = models.Transaction(
-                    user_id=current_user.id,
-                    title=txn_data["title"],
-                    amount=txn_data["amount"],
-                    type=txn_data["type"],
-                    category=txn_data["category"],
-                    bank=txn_data["bank"],
-                    date=datetime.fromisoformat(txn_data["date"])
-                )
-                db.add(new_transaction)
-                new_count += 1
+    # Runs in the background; poll GET /api/gmail/sync/{job_id} for progress
+    return enqueue_gmail_sync(
+        db,
+        current_user.id,
+        credentials.email,
+        credentials.app_password,
+        backfill_days=credentials.backfill_days
+    )
 
-        db.commit()
 
-        return {
-            "message": "Sync completed",
-            "total_found": len(email_transactions),
-            "new_transactions": new_count
-        }
+@app.get("/api/gmail/sync/{job_id}", response_model=schemas.SyncJobResponse)
+def get_sync_job(
+        job_id: int,
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_db)
+):
+    job = db.query(models.SyncJob).filter(
+        models.SyncJob.id == job_id,
+        models.SyncJob.user_id == current_user.id
+    ).first()
 
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    if not job:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job
 
 
 @app.get("/api/gmail/status")
 def gmail_status(
-        current_user: models.User = Depends(get_current_user)
+        current_user: Principal = Depends(get_current_user),
+        db: Session = Depends(get_db)
 ):
-    return {
-        "connected": current_user.gmail_connected,
-        "email": current_user.gmail_email if current_user.gmail_connected else None
-    }
\ No newline at end of file
+    return load_gmail_status(db, current_user.id)
\ No newline at end of file
@@ -0,0 +1,207 @@
+"""Keyword matcher for bank alert emails, compiled once on first use.
+
+Every bank name, direction word and category keyword is folded into one
+trie-shaped regex. An email is split into whitespace tokens in a single
+pass and each distinct token is resolved through the regex once, then
+memoized. Matches are longest-first; each keyword also carries the roles
+of the shorter keywords it contains, and scanning resumes early only
+where another keyword could overlap the match. Together that keeps the
+plain substring semantics of the original keyword lists.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+
+BANKS = ["HDFC", "ICICI", "SBI", "Axis", "Kotak", "IDFC", "Yes Bank", "IndusInd", "PNB", "BOB", "Canara",
+         "Union Bank"]
+
+INCOME_WORDS = ["credited", "credit", "received", "deposit"]
+EXPENSE_WORDS = ["debited", "debit", "spent", "paid", "purchase", "withdrawal"]
+
+CATEGORY_KEYWORDS = {
+    "Food": ["restaurant", "cafe", "zomato", "swiggy", "food", "dining", "hotel", "eatery"],
+    "Shopping": ["amazon", "flipkart", "myntra", "shopping", "mall", "store", "mart", "retail"],
+    "Transport": ["uber", "ola", "petrol", "diesel", "fuel", "parking", "toll", "transport"],
+    "Utilities": ["electricity", "water", "gas", "bill", "utility", "broadband", "internet", "mobile",
+                  "recharge"],
+    "Entertainment": ["netflix", "prime", "spotify", "movie", "cinema", "entertainment", "subscription"],
+    "Healthcare": ["hospital", "clinic", "pharmacy", "medical", "doctor", "health"],
+    "Education": ["school", "college", "university", "course", "tuition", "education"],
+    "Income": ["salary", "credited", "credit", "received", "deposit", "income"]
+}
+CATEGORIES = list(CATEGORY_KEYWORDS)
+
+# Role kinds
+BANK, INCOME, EXPENSE, CATEGORY = "bank", "income", "expense", "category"
+
+# (kind, priority) of each keyword; lower priority wins, as in the original list order
+_roles: Dict[str, Set[Tuple[str, int]]] = {}
+for _i, _bank in enumerate(BANKS):
+    _roles.setdefault(_bank.lower(), set()).add((BANK, _i))
+for _word in INCOME_WORDS:
+    _roles.setdefault(_word, set()).add((INCOME, 0))
+for _word in EXPENSE_WORDS:
+    _roles.setdefault(_word, set()).add((EXPENSE, 0))
+for _i, _category in enumerate(CATEGORIES):
+    for _word in CATEGORY_KEYWORDS[_category]:
+        _roles.setdefault(_word, set()).add((CATEGORY, _i))
+
+KEYWORD_ROLES: Dict[str, Tuple[Tuple[str, int], ...]] = {
+    keyword: tuple(sorted(set().union(*(roles for other, roles in _roles.items() if other in keyword))))
+    for keyword in _roles
+}
+
+
+
+def _trie_pattern(words) -> str:
+    """Regex alternation shaped like a trie; greedy, so the longest word wins"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            return "(?:" + pattern + ")?" if len(branches) == 1 else pattern + "?"
+        return pattern
+
+    return build(trie)
+
+
+def _resume_offset(keyword: str) -> int:
+    """How far past a match's start the next keyword could begin without being inside it"""
+    for offset in range(1, len(keyword)):
+        tail = keyword[offset:]
+        if any(other.startswith(tail) and other != tail for other in KEYWORD_ROLES):
+            return offset
+    return len(keyword)
+
+
+@lru_cache(maxsize=None)
+def _compiled() -> Tuple["re.Pattern", Dict[str, int]]:
+    # Built on the first scan rather than at import, which API cold starts pay for
+    return re.compile(_trie_pattern(KEYWORD_ROLES)), {keyword: _resume_offset(keyword) for keyword in KEYWORD_ROLES}
+
+
+def _iter_keywords(text: str):
+    """Yield (start, keyword) for every keyword occurrence not contained in another"""
+    keywords, resume = _compiled()
+    search = keywords.search
+    match = search(text)
+    while match:
+        keyword = match.group()
+        yield match.start(), keyword
+        match = search(text, match.start() + resume[keyword])
+
+AMOUNT_PATTERNS = [
+    re.compile(r'(?:Rs\.?|INR|₹)\s*([0-9,]+(?:\.[0-9]{2})?)', re.IGNORECASE),
+    re.compile(r'(?:amount|Amount|AMOUNT)[\s:]*(?:Rs\.?|INR|₹)?\s*([0-9,]+(?:\.[0-9]{2})?)', re.IGNORECASE),
+    re.compile(r'(?:debited|credited|spent|paid)[\s:]*(?:Rs\.?|INR|₹)?\s*([0-9,]+(?:\.[0-9]{2})?)', re.IGNORECASE)
+]
+
+MERCHANT_PATTERNS = [
+    re.compile(r'(?:at|to|from)\s+([A-Z][A-Za-z0-9\s&]+?)(?:\s+on|\.|,)'),
+    re.compile(r'(?:merchant|Merchant|MERCHANT)[\s:]+([A-Za-z0-9\s&]+?)(?:\s+on|\.|,)'),
+    re.compile(r'(?:transaction at|payment to)\s+([A-Za-z0-9\s&]+?)(?:\s+on|\.|,)')
+]
+
+
+class AlertMatch:
+    """Everything the keyword scan found in one alert"""
+
+    __slots__ = ("bank", "direction", "_body_category", "_subject_category")
+
+    def __init__(self, bank: str, direction: Optional[str], body_category: int, subject_category: int):
+        self.bank = bank
+        self.direction = direction
+        self._body_category = body_category
+        self._subject_category = subject_category
+
+    def category(self, title_from_subject: bool = False) -> str:
+        """Category of the alert; subject keywords count only when the title came from it"""
+        best = self._body_category
+        if title_from_subject:
+            best = min(best, self._subject_category)
+        return CATEGORIES[best] if best < len(CATEGORIES) else "Other"
+
+
+# Keywords with spaces can't be found inside a single whitespace-separated token
+_PHRASES = [keyword for keyword in KEYWORD_ROLES if " " in keyword]
+
+
+@lru_cache(maxsize=65536)
+def _token_roles(token: str) -> FrozenSet[Tuple[str, int]]:
+    roles = set()
+    for _, keyword in _iter_keywords(token):
+        roles.update(KEYWORD_ROLES[keyword])
+    return frozenset(roles)
+
+
+def _roles_in(text: str) -> Set[Tuple[str, int]]:
+    """Roles of every keyword occurring in already lower-cased text.
+
+    Keywords never span whitespace, so matching each distinct token once
+    (memoized across emails, whose boilerplate repeats) sees exactly the
+    substrings a scan of the whole text would.
+    """
+    roles: Set[Tuple[str, int]] = set()
+    for token in set(text.split()):
+        found = _token_roles(token)
+        if found:
+            roles |= found
+    for phrase in _PHRASES:
+        if phrase in text:
+            roles.update(KEYWORD_ROLES[phrase])
+    return roles
+
+
+def _best(roles: Set[Tuple[str, int]], kind: str, default: int) -> int:
+    return min((priority for role, priority in roles if role == kind), default=default)
+
+
+def scan_alert(subject: str, body: str, subject_title_length: int = 50) -> AlertMatch:
+    """Single pass over subject and body for bank, direction and category"""
+    subject = subject.lower()
+    body_roles = _roles_in(body.lower())
+    subject_roles = _roles_in(subject)
+    title_roles = _roles_in(subject[:subject_title_length])
+    nothing = len(CATEGORIES)
+
+    bank = _best(body_roles | subject_roles, BANK, len(BANKS))
+    kinds = {role for role, _ in body_roles}
+    direction = "income" if INCOME in kinds else "expense" if EXPENSE in kinds else None
+
+    return AlertMatch(
+        BANKS[bank] if bank < len(BANKS) else "",
+        direction,
+        _best(body_roles, CATEGORY, nothing),
+        _best(title_roles, CATEGORY, nothing)
+    )
+
+
+def categorize(text: str) -> str:
+    """Category of free text, e.g. a transaction title"""
+    best = _best(_roles_in(text.lower()), CATEGORY, len(CATEGORIES))
+    return CATEGORIES[best] if best < len(CATEGORIES) else "Other"
+
+
+def find_amount(body: str) -> Optional[float]:
+    for pattern in AMOUNT_PATTERNS:
+        match = pattern.search(body)
+        if match:
+            return float(match.group(1).replace(',', ''))
+    return None
+
+
+def find_merchant(body: str) -> str:
+    for pattern in MERCHANT_PATTERNS:
+        match = pattern.search(body)
+        if match:
+            return match.group(1).strip()
+    return ""
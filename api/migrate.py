@@ -0,0 +1,77 @@
+"""Create or update the database schema.
+
+The app no longer touches the schema on startup; run this once per deploy
+(and after pulling model changes locally):
+
+    python -m api.migrate
+
+Missing tables are created with their indexes. On tables that already
+exist, missing columns are added and missing indexes created, which
+covers the additive changes the models have had so far. Rollup tables
+created on a database that already has transactions are filled in.
+"""
+import sys
+from typing import List, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+
+from . import models
+from .database import get_engine
+from .rollups import rebuild_rollups
+
+
+def migrate(engine: Optional[Engine] = None) -> List[str]:
+    """Bring the schema up to date; returns a line per change made"""
+    engine = engine or get_engine()
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    changes = []
+
+    with engine.begin() as connection:
+        for table in models.Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                changes.append(f"added column {table.name}.{column.name}")
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    index.create(connection)
+                    changes.append(f"created index {index.name}")
+
+        missing = [table for table in models.Base.metadata.sorted_tables if table.name not in existing_tables]
+        models.Base.metadata.create_all(bind=connection, tables=missing)
+        changes.extend(f"created table {table.name}" for table in missing)
+
+    # Rollups added to a database that already has transactions start empty
+    if models.BalanceRollup.__table__ in missing and models.Transaction.__tablename__ in existing_tables:
+        db = Session(bind=engine)
+        try:
+            users = rebuild_rollups(db)
+        finally:
+            db.close()
+        changes.append(f"rebuilt rollups for {users} user(s)")
+
+    return changes
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    changes = migrate()
+    for change in changes:
+        print(change)
+    print(f"{len(changes)} change(s) applied")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
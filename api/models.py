@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -11,6 +11,10 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     name = Column(String, nullable=False)
     hashed_password = Column(String, nullable=False)
+    # Bumped to revoke every token issued before; see principals.revoke_tokens
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every change to the user's data; see data_versions
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
 
     transactions = relationship("Transaction", back_populates="user", cascade="all, delete-orphan")
@@ -33,10 +37,22 @@ class Transaction(Base):
     type = Column(String, nullable=False)
     bank = Column(String)
     description = Column(Text)
+    # Stable source identity (e.g. hashed Message-ID) used to dedupe imports
+    fingerprint = Column(String(64))
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="transactions")
 
+    __table_args__ = (
+        # Covers the analytics range scans; the trailing columns make them
+        # index-only. Plain key columns rather than dialect options (INCLUDE)
+        # keep importing the models from loading every dialect package
+        Index("ix_transactions_user_type_date", "user_id", "type", "date", "category", "amount"),
+        # Keyset pagination for the transaction list
+        Index("ix_transactions_user_date_id", user_id, date.desc(), id.desc()),
+        Index("ux_transactions_user_fingerprint", "user_id", "fingerprint", unique=True),
+    )
+
 
 class Goal(Base):
     __tablename__ = "goals"
@@ -78,6 +94,74 @@ class GmailConnection(Base):
     refresh_token = Column(Text)
     last_synced = Column(DateTime)
     transactions_count = Column(Integer, default=0)
+    # IMAP watermark for incremental sync
+    uid_validity = Column(BigInteger)
+    last_uid = Column(BigInteger, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="gmail_connection")
\ No newline at end of file
+    user = relationship("User", back_populates="gmail_connection")
+
+class BalanceRollup(Base):
+    __tablename__ = "balance_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total_income = Column(Float, nullable=False, default=0.0)
+    total_expenses = Column(Float, nullable=False, default=0.0)
+    transactions_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class MonthlyRollup(Base):
+    __tablename__ = "monthly_rollups"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)  # "YYYY-MM"
+    total_income = Column(Float, nullable=False, default=0.0)
+    total_expenses = Column(Float, nullable=False, default=0.0)
+    transactions_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SyncJob(Base):
+    __tablename__ = "sync_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    # user_id while queued or running, NULL once finished; see the index below
+    active_user_id = Column(Integer)
+    phase = Column(String, default="queued")  # connecting, fetching, saving, done
+    backfill_days = Column(Integer)
+    messages_scanned = Column(Integer, default=0)
+    transactions_found = Column(Integer, default=0)
+    new_transactions = Column(Integer, default=0)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        # At most one active job per user, whichever process enqueues it.
+        # NULLs never collide, so finished jobs don't count
+        Index("ux_sync_jobs_active_user", "active_user_id", unique=True),
+    )
+
+
+class AdviceCacheEntry(Base):
+    __tablename__ = "advice_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of user, query and context
+    advice = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False)
+
+
+class MerchantCategory(Base):
+    __tablename__ = "merchant_categories"
+
+    merchant = Column(String(255), primary_key=True)  # normalized transaction title
+    category = Column(String, nullable=False)
+    source = Column(String, default="llm")
+    created_at = Column(DateTime, default=datetime.utcnow)
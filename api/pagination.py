@@ -0,0 +1,29 @@
+import base64
+from datetime import datetime
+from typing import Tuple
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(date: datetime, row_id: int) -> str:
+    """Opaque cursor pointing just past the (date, id) of the last row on a page"""
+    raw = f"{date.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        date, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(date), int(row_id)
+    except (TypeError, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+
+def after_cursor(date_column, id_column, cursor: str):
+    """Keyset predicate for rows after the cursor in (date DESC, id DESC) order"""
+    date, row_id = decode_cursor(cursor)
+    # A row comparison, unlike the equivalent OR, lets Postgres seek straight
+    # into the (user_id, date DESC, id DESC) index instead of filtering from the top
+    return tuple_(date_column, id_column) < tuple_(date, row_id)
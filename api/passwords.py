@@ -0,0 +1,83 @@
+"""Password hashing off the request threadpool.
+
+bcrypt is deliberately slow, so hashes are computed on a small dedicated
+executor instead of the shared threadpool that serves sync endpoints.
+The number of hashes waiting is bounded; past that, requests are shed
+with PasswordHashingBusy rather than queueing without limit.
+
+    PASSWORD_WORKERS      threads hashing at once (default 2)
+    PASSWORD_QUEUE_LIMIT  hashes queued or running before shedding (default 32)
+    BCRYPT_ROUNDS         cost factor; hashes at any other cost are
+                          upgraded on the next successful login (default 12)
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Optional, Tuple
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_LIMIT = int(os.getenv("PASSWORD_QUEUE_LIMIT", "32"))
+
+_pwd_context: Optional["CryptContext"] = None
+_pwd_context_lock = threading.Lock()
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="password-hash")
+_pending = 0
+_pending_lock = threading.Lock()
+
+
+def get_pwd_context() -> "CryptContext":
+    """The bcrypt context, built on first use so importing the API doesn't load passlib"""
+    global _pwd_context
+    with _pwd_context_lock:
+        if _pwd_context is None:
+            from passlib.context import CryptContext
+
+            # min == max rounds makes passlib flag any hash at a different cost for rehash
+            _pwd_context = CryptContext(
+                schemes=["bcrypt"],
+                deprecated="auto",
+                bcrypt__default_rounds=BCRYPT_ROUNDS,
+                bcrypt__min_rounds=BCRYPT_ROUNDS,
+                bcrypt__max_rounds=BCRYPT_ROUNDS
+            )
+    return _pwd_context
+
+
+class PasswordHashingBusy(Exception):
+    retry_after = 1
+
+    def __init__(self):
+        super().__init__("Too many sign-in attempts in progress, try again shortly")
+
+
+def _release(_):
+    global _pending
+    with _pending_lock:
+        _pending -= 1
+
+
+async def _run(func: Callable, *args):
+    global _pending
+    with _pending_lock:
+        if _pending >= PASSWORD_QUEUE_LIMIT:
+            raise PasswordHashingBusy()
+        _pending += 1
+
+    future = _executor.submit(func, *args)
+    future.add_done_callback(_release)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(get_pwd_context().hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash should be upgraded"""
+    return await _run(get_pwd_context().verify_and_update, password, hashed_password)
@@ -0,0 +1,160 @@
+"""Connection pooling profiles and pool metrics.
+
+Two named profiles, picked with DB_POOL_PROFILE:
+
+    server      long-lived workers: a QueuePool that pings connections
+                before use and recycles them before the server or a load
+                balancer drops them idle
+    serverless  short-lived functions: no pool in-process (NullPool); put
+                an external pooler (PgBouncer, Supabase/Neon pooler) in
+                front of the database instead
+
+Without DB_POOL_PROFILE, serverless is picked on Vercel and Lambda and
+server everywhere else. The server profile reads:
+
+    DB_POOL_SIZE      connections kept open (default 5)
+    DB_MAX_OVERFLOW   extra connections under burst (default 10)
+    DB_POOL_TIMEOUT   seconds to wait for a free connection (default 30)
+    DB_POOL_RECYCLE   seconds before a connection is replaced (default 1800)
+
+Pools record how long checkouts waited and how many timed out, so
+exhaustion shows up in pool_status() before requests start failing.
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+SERVER = "server"
+SERVERLESS = "serverless"
+PROFILES = (SERVER, SERVERLESS)
+
+
+def _default_profile() -> str:
+    if os.getenv("VERCEL") or os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        return SERVERLESS
+    return SERVER
+
+
+POOL_PROFILE = os.getenv("DB_POOL_PROFILE") or _default_profile()
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+if POOL_PROFILE not in PROFILES:
+    raise ValueError(f"DB_POOL_PROFILE must be one of {', '.join(PROFILES)}, not {POOL_PROFILE!r}")
+
+
+class WaitStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_total, 6),
+                "wait_seconds_max": round(self.wait_max, 6),
+                "wait_seconds_avg": round(self.wait_total / attempts, 6) if attempts else 0.0,
+            }
+
+
+class _TimedCheckout:
+    """Times every checkout, including the wait for a free connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = WaitStats()
+
+    def recreate(self):
+        # Keep counters across pool recreation (e.g. after a dispose)
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            self.wait_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(time.perf_counter() - started)
+        return connection
+
+
+class _KnownOverflow:
+    """Keeps the configured max_overflow readable; QueuePool only stores it privately"""
+
+    def __init__(self, *args, max_overflow: int = 10, **kwargs):
+        super().__init__(*args, max_overflow=max_overflow, **kwargs)
+        self.max_overflow = max_overflow
+
+
+class TimedQueuePool(_TimedCheckout, _KnownOverflow, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, _KnownOverflow, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(_TimedCheckout, NullPool):
+    pass
+
+
+def engine_options(is_async: bool = False, profile: Optional[str] = None) -> Dict:
+    """Keyword arguments for create_engine / create_async_engine under a profile"""
+    profile = profile or POOL_PROFILE
+    if profile == SERVERLESS:
+        return {"poolclass": TimedNullPool}
+    return {
+        "poolclass": TimedAsyncQueuePool if is_async else TimedQueuePool,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "pool_recycle": POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+
+def max_overflow(pool: QueuePool) -> int:
+    """Connections the pool may open past its size; negative means no limit"""
+    return getattr(pool, "max_overflow", MAX_OVERFLOW)
+
+
+def pool_status(pool: Pool) -> Dict:
+    """Occupancy and wait counters for one engine's pool"""
+    status = {"class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # Negative while the pool hasn't opened pool_size connections yet
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": max_overflow(pool),
+        })
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        status.update(wait_stats.snapshot())
+    return status
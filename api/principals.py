@@ -0,0 +1,88 @@
+"""Authenticated principals cached in-process.
+
+A token carries the user id and the user's token_version. The first
+request with a given (id, version) pair loads a few columns from users;
+later ones are served from memory until AUTH_CACHE_TTL runs out. Bumping
+users.token_version (password change, account change) invalidates every
+token issued before it, and the cache with them.
+"""
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+PRINCIPAL_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+MAX_PRINCIPALS = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+
+
+class Principal:
+    """The signed-in user as handlers see it; no ORM row behind it"""
+
+    __slots__ = ("id", "token_version", "email", "name")
+
+    def __init__(self, id: int, token_version: int, email: str, name: str):
+        self.id = id
+        self.token_version = token_version
+        self.email = email
+        self.name = name
+
+
+class PrincipalCache:
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[int, int], Tuple[float, Principal]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: int, token_version: int) -> Optional[Principal]:
+        with self._lock:
+            entry = self._entries.get((user_id, token_version))
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, principal: Principal):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[(principal.id, principal.token_version)] = (time.monotonic() + self.ttl, principal)
+
+    def evict(self, user_id: int):
+        with self._lock:
+            self._entries = {key: entry for key, entry in self._entries.items() if key[0] != user_id}
+
+
+principal_cache = PrincipalCache(PRINCIPAL_TTL, MAX_PRINCIPALS)
+
+
+def load_principal(db: Session, user_id: int, token_version: int) -> Optional[Principal]:
+    """Cached principal for a token, or None if the user is gone or the token was revoked"""
+    principal = principal_cache.get(user_id, token_version)
+    if principal is not None:
+        return principal
+
+    row = db.query(
+        models.User.id,
+        models.User.token_version,
+        models.User.email,
+        models.User.name
+    ).filter(models.User.id == user_id).first()
+    if row is None or (row.token_version or 0) != token_version:
+        return None
+
+    principal = Principal(row.id, token_version, row.email, row.name)
+    principal_cache.put(principal)
+    return principal
+
+
+def revoke_tokens(db: Session, user: models.User):
+    """Invalidate every token issued to the user so far; the caller commits"""
+    user.token_version = (user.token_version or 0) + 1
+    principal_cache.evict(user.id)
@@ -0,0 +1,249 @@
+"""Per-user balance rollups kept in step with the transactions table.
+
+Every handler that writes transactions calls ``apply_rollups`` before its
+commit, so the dashboard reads a single row instead of summing history.
+
+    python -m api.rollups --verify   # report drift against raw rows
+    python -m api.rollups --rebuild  # recompute rollups from raw rows
+"""
+import argparse
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from . import models
+from .analytics import period_column
+
+# (amount, type, date) of a transaction row
+RollupRow = Tuple[float, str, Optional[datetime]]
+
+DRIFT_TOLERANCE = 0.005
+
+
+def month_key(date: Optional[datetime]) -> str:
+    return (date or datetime.utcnow()).strftime("%Y-%m")
+
+
+def _row_deltas(amount: float, txn_type: str) -> Tuple[float, float]:
+    if txn_type == "income":
+        return amount, 0.0
+    if txn_type == "expense":
+        return 0.0, abs(amount)
+    return 0.0, 0.0
+
+
+def dialect_insert(dialect: str):
+    """insert() with ON CONFLICT support for postgresql or sqlite"""
+    # Imported here: the postgresql dialect is a noticeable share of a cold start
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _upsert(db: Session, model, keys: Dict, deltas: Dict):
+    """Insert a rollup row or add the deltas to the existing one"""
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        stmt = dialect_insert(dialect)(model).values(**keys, **deltas, updated_at=datetime.utcnow())
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                **{name: getattr(model, name) + stmt.excluded[name] for name in deltas},
+                "updated_at": stmt.excluded.updated_at,
+            }
+        )
+        db.execute(stmt)
+        return
+
+    updated = db.query(model).filter_by(**keys).update(
+        {getattr(model, name): getattr(model, name) + value for name, value in deltas.items()},
+        synchronize_session=False
+    )
+    if not updated:
+        db.add(model(**keys, **deltas))
+        db.flush()
+
+
+def apply_rollups(db: Session, user_id: int, rows: Iterable[RollupRow], sign: int = 1):
+    """Add (sign=1) or remove (sign=-1) transaction rows from the user's rollups.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    months: Dict[str, List[float]] = {}
+    for amount, txn_type, date in rows:
+        income, expenses = _row_deltas(amount, txn_type)
+        totals = months.setdefault(month_key(date), [0.0, 0.0, 0])
+        totals[0] += income
+        totals[1] += expenses
+        totals[2] += 1
+
+    if not months:
+        return
+
+    overall = [0.0, 0.0, 0]
+    for month, (income, expenses, count) in months.items():
+        _upsert(db, models.MonthlyRollup, {"user_id": user_id, "month": month}, {
+            "total_income": sign * income,
+            "total_expenses": sign * expenses,
+            "transactions_count": sign * count,
+        })
+        overall[0] += income
+        overall[1] += expenses
+        overall[2] += count
+
+    _upsert(db, models.BalanceRollup, {"user_id": user_id}, {
+        "total_income": sign * overall[0],
+        "total_expenses": sign * overall[1],
+        "transactions_count": sign * overall[2],
+    })
+
+
+def get_balance(db: Session, user_id: int) -> Tuple[float, float]:
+    """Return (total_income, total_expenses) for a user from the rollup row"""
+    row = db.query(
+        models.BalanceRollup.total_income,
+        models.BalanceRollup.total_expenses
+    ).filter(models.BalanceRollup.user_id == user_id).first()
+    if row is None:
+        return 0.0, 0.0
+    return row.total_income, row.total_expenses
+
+
+def compute_rollups(db: Session, user_id: Optional[int] = None) -> Dict[Tuple[int, str], List[float]]:
+    """Recompute monthly rollups from raw transaction rows, grouped in SQL"""
+    txn = models.Transaction
+    month = period_column(db, txn.date, "month")
+    query = db.query(
+        txn.user_id,
+        month.label("month"),
+        func.coalesce(func.sum(txn.amount).filter(txn.type == "income"), 0.0),
+        func.coalesce(func.sum(func.abs(txn.amount)).filter(txn.type == "expense"), 0.0),
+        func.count(txn.id)
+    )
+    if user_id is not None:
+        query = query.filter(txn.user_id == user_id)
+
+    return {
+        (uid, month_value): [total_income, total_expenses, count]
+        for uid, month_value, total_income, total_expenses, count in query.group_by(txn.user_id, month)
+    }
+
+
+def verify_rollups(db: Session, user_id: Optional[int] = None) -> List[Dict]:
+    """Compare stored rollups with raw rows and return every drifted value"""
+    expected = compute_rollups(db, user_id)
+    expected_totals: Dict[int, List[float]] = {}
+    for (uid, _), values in expected.items():
+        totals = expected_totals.setdefault(uid, [0.0, 0.0, 0])
+        for i, value in enumerate(values):
+            totals[i] += value
+
+    monthly = db.query(models.MonthlyRollup)
+    balances = db.query(models.BalanceRollup)
+    if user_id is not None:
+        monthly = monthly.filter(models.MonthlyRollup.user_id == user_id)
+        balances = balances.filter(models.BalanceRollup.user_id == user_id)
+
+    stored = {
+        (r.user_id, r.month): [r.total_income, r.total_expenses, r.transactions_count] for r in monthly
+    }
+    stored_totals = {
+        r.user_id: [r.total_income, r.total_expenses, r.transactions_count] for r in balances
+    }
+
+    drift = []
+    fields = ("total_income", "total_expenses", "transactions_count")
+
+    def compare(want: Dict, have: Dict, month_of):
+        for key in set(want) | set(have):
+            zeros = [0.0, 0.0, 0]
+            for field, a, b in zip(fields, want.get(key, zeros), have.get(key, zeros)):
+                if abs((a or 0) - (b or 0)) > DRIFT_TOLERANCE:
+                    uid, month = month_of(key)
+                    drift.append({
+                        "user_id": uid,
+                        "month": month,
+                        "field": field,
+                        "expected": a,
+                        "actual": b
+                    })
+
+    compare(expected, stored, lambda key: key)
+    compare(expected_totals, stored_totals, lambda key: (key, None))
+    return drift
+
+
+def rebuild_rollups(db: Session, user_id: Optional[int] = None) -> int:
+    """Replace stored rollups with values recomputed from raw rows; returns users rebuilt"""
+    expected = compute_rollups(db, user_id)
+
+    monthly = db.query(models.MonthlyRollup)
+    balances = db.query(models.BalanceRollup)
+    if user_id is not None:
+        monthly = monthly.filter(models.MonthlyRollup.user_id == user_id)
+        balances = balances.filter(models.BalanceRollup.user_id == user_id)
+    monthly.delete(synchronize_session=False)
+    balances.delete(synchronize_session=False)
+
+    totals: Dict[int, List[float]] = {}
+    for (uid, month), (income, expenses, count) in expected.items():
+        db.add(models.MonthlyRollup(
+            user_id=uid,
+            month=month,
+            total_income=income,
+            total_expenses=expenses,
+            transactions_count=count
+        ))
+        user_totals = totals.setdefault(uid, [0.0, 0.0, 0])
+        user_totals[0] += income
+        user_totals[1] += expenses
+        user_totals[2] += count
+
+    for uid, (income, expenses, count) in totals.items():
+        db.add(models.BalanceRollup(
+            user_id=uid,
+            total_income=income,
+            total_expenses=expenses,
+            transactions_count=count
+        ))
+
+    db.commit()
+    return len(totals)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from .database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Verify or rebuild per-user balance rollups")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--verify", action="store_true", help="report drift without changing anything")
+    mode.add_argument("--rebuild", action="store_true", help="recompute rollups from raw transactions")
+    parser.add_argument("--user-id", type=int, help="limit to a single user")
+    args = parser.parse_args(argv)
+
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            rebuilt = rebuild_rollups(db, args.user_id)
+            print(f"Rebuilt rollups for {rebuilt} user(s)")
+            return 0
+
+        drift = verify_rollups(db, args.user_id)
+        for item in drift:
+            scope = item["month"] or "total"
+            print(f"user {item['user_id']} {scope} {item['field']}: "
+                  f"expected {item['expected']} got {item['actual']}")
+        print(f"{len(drift)} drifted value(s)")
+        return 1 if drift else 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
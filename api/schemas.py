@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 
 # User Schemas
@@ -10,6 +10,11 @@ class UserCreate(BaseModel):
     password: str
 
 
+class PasswordChange(BaseModel):
+    current_password: str
+    new_password: str
+
+
 class UserResponse(BaseModel):
     id: int
     email: str
@@ -108,6 +113,34 @@ class GmailStatus(BaseModel):
 class GmailCredentials(BaseModel):
     email: str
     app_password: str
+    # Backfill this many days of history instead of an incremental sync
+    backfill_days: Optional[int] = Field(None, ge=1, le=730)
+
+class SyncJobResponse(BaseModel):
+    id: int
+    status: str
+    phase: Optional[str]
+    backfill_days: Optional[int]
+    messages_scanned: int
+    transactions_found: int
+    new_transactions: int
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+
+class DashboardBundle(BaseModel):
+    # Only the sections asked for in ?fields= are present
+    stats: Optional[DashboardStats] = None
+    transactions: Optional[List[TransactionResponse]] = None
+    goals: Optional[List[GoalResponse]] = None
+    spending: Optional[Dict[str, Any]] = None
+    gmail: Optional[GmailStatus] = None
+
 
 class AIQuery(BaseModel):
     query: str
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""A local IMAP server speaking just enough of the protocol for imaplib.
+
+It serves an in-memory mailbox over plain TCP on 127.0.0.1 and records
+every command it receives and every literal byte it sends, so tests can
+assert round trips and transfer sizes the way Gmail would see them.
+"""
+import email
+import re
+import socketserver
+import threading
+from typing import Dict, List, Optional
+
+_FETCH_SECTION = re.compile(r"BODY(?:\.PEEK)?\[([^\]]*)\](?:<(\d+)\.(\d+)>)?")
+
+
+def _split_message(raw: bytes):
+    separator = b"\r\n\r\n" if b"\r\n\r\n" in raw else b"\n\n"
+    head, _, body = raw.partition(separator)
+    return head + separator, body
+
+
+def message_section(raw: bytes, spec: str) -> bytes:
+    """Bytes of BODY[spec] for a message: HEADER.FIELDS, 1, 1.MIME or the whole message"""
+    msg = email.message_from_bytes(raw)
+    head, body = _split_message(raw)
+    if spec == "":
+        return raw
+    if spec.startswith("HEADER.FIELDS"):
+        wanted = set(re.findall(r"[A-Z-]+", spec.split("(", 1)[1].upper()))
+        lines = [f"{name}: {value}" for name, value in msg.items() if name.upper() in wanted]
+        return ("\r\n".join(lines) + "\r\n\r\n").encode()
+    if spec in ("1", "1.MIME"):
+        if not msg.is_multipart():
+            return body
+        part_head, part_body = _split_message(msg.get_payload(0).as_bytes())
+        return part_head if spec == "1.MIME" else part_body
+    raise ValueError(f"Unsupported section {spec}")
+
+
+class FakeIMAPServer:
+    def __init__(self, mailbox: Dict[int, bytes], uid_validity: int = 1):
+        self.mailbox = dict(mailbox)
+        self.uid_validity = uid_validity
+        self.commands: List[str] = []
+        self.bytes_sent = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+        fake = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with fake._lock:
+                    fake.connections += 1
+                self.wfile.write(b"* OK fake IMAP ready\r\n")
+                while True:
+                    line = self.rfile.readline()
+                    if not line:
+                        return
+                    tag, _, rest = line.decode().rstrip("\r\n").partition(" ")
+                    if not fake._dispatch(self.wfile, tag, rest):
+                        return
+
+        self._server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "FakeIMAPServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def commands_named(self, name: str) -> List[str]:
+        return [command for command in self.commands if command.upper().startswith(name)]
+
+    def _dispatch(self, out, tag: str, rest: str) -> bool:
+        command, _, args = rest.partition(" ")
+        command = command.upper()
+        with self._lock:
+            self.commands.append(rest)
+
+        if command == "CAPABILITY":
+            out.write(b"* CAPABILITY IMAP4rev1\r\n")
+        elif command == "LOGIN":
+            pass
+        elif command in ("SELECT", "EXAMINE"):
+            uid_next = max(self.mailbox, default=0) + 1
+            out.write(f"* {len(self.mailbox)} EXISTS\r\n".encode())
+            out.write(f"* OK [UIDVALIDITY {self.uid_validity}] UIDs valid\r\n".encode())
+            out.write(f"* OK [UIDNEXT {uid_next}] Predicted next UID\r\n".encode())
+        elif command == "UID":
+            subcommand, _, args = args.partition(" ")
+            if subcommand.upper() == "SEARCH":
+                self._search(out, args)
+            elif subcommand.upper() == "FETCH":
+                self._fetch(out, args)
+            else:
+                out.write(f"{tag} BAD unsupported\r\n".encode())
+                return True
+        elif command == "LOGOUT":
+            out.write(b"* BYE logging out\r\n")
+            out.write(f"{tag} OK LOGOUT completed\r\n".encode())
+            return False
+        else:
+            out.write(f"{tag} BAD unsupported\r\n".encode())
+            return True
+
+        out.write(f"{tag} OK {command} completed\r\n".encode())
+        return True
+
+    def _search(self, out, criteria: str):
+        uids = sorted(self.mailbox)
+        since = re.search(r"UID (\d+):\*", criteria)
+        if since:
+            # Like real servers, n:* always includes the newest message
+            uids = [uid for uid in uids if uid >= int(since.group(1))] or uids[-1:]
+        out.write(("* SEARCH " + " ".join(map(str, uids))).rstrip().encode() + b"\r\n")
+
+    def _uids(self, uid_set: str) -> List[int]:
+        wanted = set()
+        for part in uid_set.split(","):
+            low, _, high = part.partition(":")
+            top = max(self.mailbox, default=0) if high == "*" else int(high or low)
+            wanted.update(uid for uid in self.mailbox if int(low) <= uid <= top)
+        return sorted(wanted)
+
+    def _fetch(self, out, args: str):
+        uid_set, _, items = args.partition(" ")
+        ordered = sorted(self.mailbox)
+        for uid in self._uids(uid_set):
+            raw = self.mailbox[uid]
+            out.write(f"* {ordered.index(uid) + 1} FETCH (UID {uid}".encode())
+            for section in _FETCH_SECTION.finditer(items):
+                data = message_section(raw, section.group(1))
+                if section.group(2) is not None:
+                    offset, length = int(section.group(2)), int(section.group(3))
+                    data = data[offset:offset + length]
+                name = f"BODY[{section.group(1)}]" + (f"<{section.group(2)}>" if section.group(2) else "")
+                out.write(f" {name} {{{len(data)}}}\r\n".encode())
+                out.write(data)
+                with self._lock:
+                    self.bytes_sent += len(data)
+            out.write(b")\r\n")
@@ -0,0 +1,74 @@
+"""A local OpenAI-compatible chat completions endpoint for tests.
+
+Runs on the test's event loop, answers every POST after an injectable
+delay (or with an error status), and counts the TCP connections and
+requests it sees. Requests with "stream": true get an SSE response.
+"""
+import asyncio
+import json
+from typing import List, Optional
+
+
+class StubLLM:
+    def __init__(self, reply: str = "ok", delay: float = 0.0, status: int = 200):
+        self.reply = reply
+        self.delay = delay
+        self.status = status
+        self.connections = 0
+        self.requests: List[dict] = []
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1/chat/completions"
+
+    async def __aenter__(self) -> "StubLLM":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.decode().split("\r\n"):
+                    name, _, value = line.partition(":")
+                    if name.lower() == "content-length":
+                        length = int(value)
+                body = json.loads(await reader.readexactly(length) or b"{}")
+                self.requests.append(body)
+
+                if self.delay:
+                    await asyncio.sleep(self.delay)
+                writer.write(self._response(body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _response(self, body: dict) -> bytes:
+        if self.status != 200:
+            payload, content_type = json.dumps({"error": "stub failure"}).encode(), "application/json"
+        elif body.get("stream"):
+            chunks = [
+                "data: " + json.dumps({"choices": [{"delta": {"content": word}}]}) + "\n\n"
+                for word in self.reply.split(" ")
+            ]
+            payload, content_type = ("".join(chunks) + "data: [DONE]\n\n").encode(), "text/event-stream"
+        else:
+            message = {"choices": [{"message": {"content": self.reply}}]}
+            payload, content_type = json.dumps(message).encode(), "application/json"
+
+        return (
+            f"HTTP/1.1 {self.status} {'OK' if self.status == 200 else 'Error'}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: keep-alive\r\n\r\n"
+        ).encode() + payload
@@ -0,0 +1,41 @@
+import asyncio
+
+from api.ai_service import GrokAIService
+from api.tests.stub_llm import StubLLM
+
+
+def test_advice_calls_share_one_keep_alive_connection(monkeypatch):
+    async def run():
+        async with StubLLM(reply="Save more") as stub:
+            monkeypatch.setenv("XAI_API_KEY", "test-key")
+            monkeypatch.setenv("XAI_API_URL", stub.url)
+            monkeypatch.delenv("AI_FALLBACK_URL", raising=False)
+            service = GrokAIService()
+            await service.start()
+            try:
+                answers = [await service.get_financial_advice("How am I doing?", context="") for _ in range(5)]
+            finally:
+                await service.aclose()
+            return stub, answers
+
+    stub, answers = asyncio.run(run())
+
+    assert answers == ["Save more"] * 5
+    assert len(stub.requests) == 5
+    assert stub.connections == 1
+
+
+def test_client_is_reopened_after_close(monkeypatch):
+    async def run():
+        async with StubLLM() as stub:
+            monkeypatch.setenv("XAI_API_KEY", "test-key")
+            monkeypatch.setenv("XAI_API_URL", stub.url)
+            monkeypatch.delenv("AI_FALLBACK_URL", raising=False)
+            service = GrokAIService()
+            await service.get_financial_advice("q", context="")
+            await service.aclose()
+            await service.get_financial_advice("q", context="")
+            await service.aclose()
+            return stub
+
+    assert asyncio.run(run()).connections == 2
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+
+from api.ai_service import GrokAIService
+from api.tests.stub_llm import StubLLM
+
+
+@pytest.fixture
+def make_service(monkeypatch):
+    def make(primary: StubLLM, fallback: StubLLM, hedge_after: float = 0.2, failures: int = 2,
+             reset_after: float = 30) -> GrokAIService:
+        monkeypatch.setenv("XAI_API_KEY", "test-key")
+        monkeypatch.setenv("XAI_API_URL", primary.url)
+        monkeypatch.setenv("AI_FALLBACK_URL", fallback.url)
+        monkeypatch.setenv("AI_HEDGE_AFTER", str(hedge_after))
+        monkeypatch.setenv("AI_BREAKER_FAILURES", str(failures))
+        monkeypatch.setenv("AI_BREAKER_RESET", str(reset_after))
+        return GrokAIService()
+    return make
+
+
+def run_with_stubs(primary: StubLLM, fallback: StubLLM, scenario):
+    async def run():
+        async with primary, fallback:
+            return await scenario()
+    return asyncio.run(run())
+
+
+def test_fast_primary_answers_without_hedging(make_service):
+    primary, fallback = StubLLM(reply="primary"), StubLLM(reply="fallback")
+
+    async def scenario():
+        service = make_service(primary, fallback)
+        try:
+            return await service.get_financial_advice("q", context="")
+        finally:
+            await service.aclose()
+
+    assert run_with_stubs(primary, fallback, scenario) == "primary"
+    assert len(fallback.requests) == 0
+
+
+def test_slow_primary_is_hedged_to_fallback(make_service):
+    primary, fallback = StubLLM(reply="primary", delay=2), StubLLM(reply="fallback")
+
+    async def scenario():
+        service = make_service(primary, fallback, hedge_after=0.1)
+        started = time.monotonic()
+        try:
+            return await service.get_financial_advice("q", context=""), time.monotonic() - started
+        finally:
+            await service.aclose()
+
+    answer, elapsed = run_with_stubs(primary, fallback, scenario)
+    assert answer == "fallback"
+    assert elapsed < 1
+
+
+def test_failing_primary_falls_over_immediately(make_service):
+    primary, fallback = StubLLM(status=500), StubLLM(reply="fallback")
+
+    async def scenario():
+        service = make_service(primary, fallback, hedge_after=5)
+        started = time.monotonic()
+        try:
+            return await service.get_financial_advice("q", context=""), time.monotonic() - started
+        finally:
+            await service.aclose()
+
+    answer, elapsed = run_with_stubs(primary, fallback, scenario)
+    assert answer == "fallback"
+    assert elapsed < 1
+
+
+def test_open_breaker_skips_the_failing_primary(make_service):
+    primary, fallback = StubLLM(status=500), StubLLM(reply="fallback")
+
+    async def scenario():
+        service = make_service(primary, fallback, failures=2)
+        try:
+            return [await service.get_financial_advice("q", context="") for _ in range(5)]
+        finally:
+            await service.aclose()
+
+    assert run_with_stubs(primary, fallback, scenario) == ["fallback"] * 5
+    assert len(primary.requests) == 2
+
+
+def test_unlaunched_fallback_keeps_its_half_open_trial(make_service):
+    primary, fallback = StubLLM(reply="primary"), StubLLM(reply="fallback")
+
+    async def scenario():
+        service = make_service(primary, fallback, reset_after=0)
+        breaker = service.providers[1].breaker
+        breaker.opened_at = opened_at = time.monotonic() - 1
+        try:
+            answer = await service.get_financial_advice("q", context="")
+        finally:
+            await service.aclose()
+        return answer, breaker.opened_at == opened_at
+
+    answer, untouched = run_with_stubs(primary, fallback, scenario)
+    assert answer == "primary"
+    assert untouched
+
+
+def test_stream_is_hedged_to_the_first_provider_with_a_token(make_service):
+    primary, fallback = StubLLM(reply="slow answer", delay=2), StubLLM(reply="fast answer")
+
+    async def scenario():
+        service = make_service(primary, fallback, hedge_after=0.1)
+        try:
+            return [token async for token in service.stream_financial_advice("q", context="")]
+        finally:
+            await service.aclose()
+
+    assert "".join(run_with_stubs(primary, fallback, scenario)) == "fastanswer"
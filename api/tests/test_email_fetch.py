@@ -0,0 +1,92 @@
+import imaplib
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+import pytest
+
+from api import email_services
+from api.email_services import BODY_BATCH_SIZE, EmailTransactionParser
+from api.tests.fake_imap import FakeIMAPServer
+
+
+def make_message(uid: int, subject: str, body: str, sender: str = "alerts@hdfcbank.net",
+                 attachment: bool = False) -> bytes:
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = sender
+    msg["To"] = "me@example.com"
+    msg["Date"] = format_datetime(datetime(2024, 1, 2, 9, 30, tzinfo=timezone.utc))
+    msg["Message-ID"] = f"<{uid}@example.com>"
+    msg.set_content(body)
+    if attachment:
+        msg.add_alternative(f"<p>{body}</p>", subtype="html")
+        msg.add_attachment(b"%PDF" + b"x" * 50_000, maintype="application", subtype="pdf", filename="statement.pdf")
+    return msg.as_bytes()
+
+
+def build_mailbox():
+    mailbox = {}
+    uid = 0
+    for i in range(60):
+        uid += 1
+        mailbox[uid] = make_message(uid, f"Debited: Rs {100 + i}", f"Rs {100 + i}.00 debited at Uber India on 2 Jan.")
+    for i in range(20):
+        uid += 1
+        mailbox[uid] = make_message(
+            uid, f"Debited: Rs {300 + i}", f"Rs {300 + i}.00 debited at Amazon on 2 Jan.", attachment=True
+        )
+    for i in range(40):
+        uid += 1
+        mailbox[uid] = make_message(uid, "Weekly digest", "x" * 20_000, sender="news@example.com")
+    return mailbox
+
+
+@pytest.fixture
+def imap_server(monkeypatch):
+    server = FakeIMAPServer(build_mailbox(), uid_validity=7).start()
+    monkeypatch.setattr(email_services.imaplib, "IMAP4_SSL", lambda host: imaplib.IMAP4("127.0.0.1", server.port))
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def parser(imap_server):
+    parser = EmailTransactionParser("me@example.com", "app-password")
+    parser.connect("imap.gmail.com")
+    yield parser
+    parser.disconnect()
+
+
+def test_headers_are_fetched_in_one_command_and_bodies_in_batches(imap_server, parser):
+    transactions = parser.fetch_transactions(limit=500)
+
+    assert len(transactions) == 80
+    # One header FETCH for all 120 messages, then bodies for the 80 alerts:
+    # 20 multipart in one batch, 60 single-part in batches of BODY_BATCH_SIZE
+    expected_fetches = 1 + 1 + -(-60 // BODY_BATCH_SIZE)
+    assert parser.stats["fetch_commands"] == expected_fetches
+    assert len(imap_server.commands_named("UID FETCH")) == expected_fetches
+    assert len(imap_server.commands_named("UID SEARCH")) == 1
+    assert parser.stats["headers"] == 120
+    assert parser.stats["bodies"] == 80
+
+
+def test_attachments_and_non_alert_bodies_are_never_transferred(imap_server, parser):
+    parser.fetch_transactions(limit=500)
+
+    mailbox_bytes = sum(len(raw) for raw in imap_server.mailbox.values())
+    assert parser.stats["bytes_fetched"] == imap_server.bytes_sent
+    assert imap_server.bytes_sent < mailbox_bytes * 0.05
+    assert all("RFC822" not in command for command in imap_server.commands)
+
+
+def test_incremental_sync_fetches_nothing_when_no_new_mail(imap_server, parser):
+    parser.fetch_transactions(limit=500)
+    validity, last_uid = parser.uid_validity, parser.last_uid
+    assert (validity, last_uid) == (7, 120)
+
+    fetches_before = len(imap_server.commands_named("UID FETCH"))
+    assert parser.fetch_transactions(uid_validity=validity, last_uid=last_uid) == []
+    assert parser.stats["fetch_commands"] == 0
+    assert len(imap_server.commands_named("UID FETCH")) == fetches_before
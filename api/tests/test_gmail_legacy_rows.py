@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import models
+from api.gmail_sync import store_transactions
+
+IST = timezone(timedelta(hours=5, minutes=30))
+ALERT_DATE = datetime(2024, 1, 2, 9, 30, tzinfo=IST)
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    models.Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(models.User(id=1, email="me@example.com", name="Me", hashed_password="x"))
+    db.commit()
+    yield db
+    db.close()
+    engine.dispose()
+
+
+def alert(fingerprint: str = "fp-1") -> dict:
+    return {
+        "title": "Uber India",
+        "amount": 250.0,
+        "type": "expense",
+        "category": "Transport",
+        "bank": "HDFC",
+        "date": ALERT_DATE.isoformat(),
+        "fingerprint": fingerprint,
+    }
+
+
+def transactions(db):
+    return db.query(models.Transaction).filter(models.Transaction.user_id == 1).all()
+
+
+# Syncs from before fingerprints bound the alert's aware date as is: SQLite
+# kept its wall time, Postgres stored it converted to UTC
+@pytest.mark.parametrize("stored_date", [
+    ALERT_DATE,
+    ALERT_DATE.astimezone(timezone.utc).replace(tzinfo=None),
+], ids=["wall-time", "utc"])
+def test_legacy_row_absorbs_its_alert(db, stored_date):
+    db.add(models.Transaction(
+        user_id=1, title="Uber India", amount=250.0, type="expense", category="Transport",
+        bank="HDFC", date=stored_date, fingerprint=None
+    ))
+    db.commit()
+
+    assert store_transactions(db, 1, [alert()]) == (1, 0)
+    assert store_transactions(db, 1, [alert()]) == (1, 0)
+    assert len(transactions(db)) == 1
+
+
+def test_new_alerts_are_stored_as_naive_utc(db):
+    assert store_transactions(db, 1, [alert()]) == (1, 1)
+    assert store_transactions(db, 1, [alert()]) == (1, 0)
+
+    [row] = transactions(db)
+    assert row.date == datetime(2024, 1, 2, 4, 0)
+    assert row.fingerprint == "fp-1"
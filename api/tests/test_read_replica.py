@@ -0,0 +1,96 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from api import database, models
+from api.main import app, create_access_token
+
+READ_YOUR_WRITES_SECONDS = 5.0
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+def seed(url: str, title: str):
+    engine = create_engine(url)
+    models.Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine)() as db:
+        db.add(models.User(id=1, email="me@example.com", name="Me", hashed_password="x"))
+        db.add(models.Transaction(user_id=1, title=title, amount=1.0, type="expense", category="Food"))
+        db.commit()
+    engine.dispose()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(database, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, clock):
+    primary, replica = f"sqlite:///{tmp_path / 'primary.db'}", f"sqlite:///{tmp_path / 'replica.db'}"
+    # The replica is a separate file, so which one answered shows in the titles
+    seed(primary, "on primary")
+    seed(replica, "on replica")
+
+    monkeypatch.setattr(database, "DATABASE_URL", primary)
+    monkeypatch.setattr(database, "REPLICA_DATABASE_URL", replica)
+    monkeypatch.setattr(database, "READ_YOUR_WRITES_SECONDS", READ_YOUR_WRITES_SECONDS)
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setattr(database, "_replica_engine", None)
+    monkeypatch.setattr(database, "_recent_writes", {})
+
+    user = models.User(id=1, token_version=0)
+    headers = {"Authorization": f"Bearer {create_access_token(user)}"}
+    with TestClient(app, headers=headers) as client:
+        yield client
+
+    for engine in (database._engine, database._replica_engine):
+        if engine is not None:
+            engine.dispose()
+
+
+def titles(client) -> set:
+    response = client.get("/api/transactions")
+    assert response.status_code == 200
+    return {transaction["title"] for transaction in response.json()}
+
+
+def test_reads_use_the_replica_by_default(client):
+    assert titles(client) == {"on replica"}
+
+
+def test_reads_follow_a_write_to_the_primary_until_the_window_passes(client, clock):
+    response = client.post("/api/transactions", json={
+        "title": "just written", "amount": 5.0, "type": "expense", "category": "Food"
+    })
+    assert response.status_code == 200
+
+    assert titles(client) == {"on primary", "just written"}
+
+    clock.now += READ_YOUR_WRITES_SECONDS - 0.1
+    assert titles(client) == {"on primary", "just written"}
+
+    clock.now += 0.2
+    assert titles(client) == {"on replica"}
+
+
+def test_read_sessions_refuse_to_flush(client):
+    db = database.ReadSessionLocal(1)
+    try:
+        db.add(models.Goal(user_id=1, title="nope", target=1.0))
+        with pytest.raises(RuntimeError, match="read-only"):
+            db.flush()
+    finally:
+        db.rollback()
+        db.close()
@@ -0,0 +1,141 @@
+"""Event-loop blocking of sync vs async database access in an async handler.
+
+    python -m bench.async_db [--requests 50] [--latency-ms 5]
+
+Replays the AI advice handler's reads (last 50 transactions, all goals)
+for many concurrent requests on one event loop, two ways:
+
+    sync   a sync Session called from the async handler, as before
+    async  an AsyncSession on aiosqlite, as the handler does now
+
+A temporary SQLite file stands in for the database; each query is
+preceded by a round_trip(ms) call that sleeps inside the driver, which
+is where a remote database's network latency would be spent. A
+heartbeat task ticking every 5 ms records how late it runs, i.e. how
+long the loop was blocked for every other request.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from api import models
+
+TICK = 0.005
+
+
+def _sleep_ms(ms):
+    time.sleep(ms / 1000)
+    return 1
+
+
+def _register_round_trip(dbapi_connection, connection_record):
+    dbapi_connection.create_function("round_trip", 1, _sleep_ms)
+
+
+def seed(url: str, users: int):
+    engine = create_engine(url)
+    models.Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with Session(engine) as db:
+        for user_id in range(1, users + 1):
+            db.add(models.User(id=user_id, email=f"u{user_id}@example.com", name="U", hashed_password="x"))
+            db.add_all(models.Transaction(
+                user_id=user_id, title=f"t{i}", amount=10.0 + i, type="expense", category="Food",
+                bank="HDFC", date=now - timedelta(days=i)
+            ) for i in range(200))
+            db.add(models.Goal(user_id=user_id, title="Fund", target=1000, current=100))
+        db.commit()
+    engine.dispose()
+
+
+async def heartbeat(lags: List[float], stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(max(time.perf_counter() - expected, 0.0))
+
+
+async def sync_request(engine, user_id: int, latency_ms: float):
+    # Blocks the loop for every round trip, like the old handler
+    with Session(engine) as db:
+        db.execute(text("SELECT round_trip(:ms)"), {"ms": latency_ms})
+        db.query(models.Transaction).filter(models.Transaction.user_id == user_id).order_by(
+            models.Transaction.date.desc()).limit(50).all()
+        db.execute(text("SELECT round_trip(:ms)"), {"ms": latency_ms})
+        db.query(models.Goal).filter(models.Goal.user_id == user_id).all()
+
+
+async def async_request(engine, user_id: int, latency_ms: float):
+    async with AsyncSession(engine) as db:
+        await db.execute(text("SELECT round_trip(:ms)"), {"ms": latency_ms})
+        (await db.execute(select(models.Transaction).filter(models.Transaction.user_id == user_id).order_by(
+            models.Transaction.date.desc()).limit(50))).scalars().all()
+        await db.execute(text("SELECT round_trip(:ms)"), {"ms": latency_ms})
+        (await db.execute(select(models.Goal).filter(models.Goal.user_id == user_id))).scalars().all()
+
+
+async def run(request, engine, requests: int, users: int, latency_ms: float):
+    lags: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(heartbeat(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(request(engine, i % users + 1, latency_ms) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    return elapsed, lags
+
+
+def report(name: str, requests: int, elapsed: float, lags: List[float]):
+    lags = sorted(lags) or [0.0]
+    p99 = lags[min(len(lags) - 1, int(len(lags) * 0.99))]
+    print(f"{name:6} {elapsed * 1000:8.1f} ms total  {requests / elapsed:7.1f} req/s  "
+          f"loop lag median {statistics.median(lags) * 1000:6.1f} ms  p99 {p99 * 1000:6.1f} ms  "
+          f"max {lags[-1] * 1000:6.1f} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async DB access under concurrency")
+    parser.add_argument("--requests", type=int, default=50, help="concurrent handler invocations")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=5, help="simulated round trip per query")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        seed(f"sqlite:///{path}", args.users)
+
+        sync_engine = create_engine(f"sqlite:///{path}", pool_size=args.requests)
+        event.listen(sync_engine, "connect", _register_round_trip)
+        elapsed, lags = asyncio.run(run(sync_request, sync_engine, args.requests, args.users, args.latency_ms))
+        sync_engine.dispose()
+        report("sync", args.requests, elapsed, lags)
+
+        async def run_async():
+            engine = create_async_engine(
+                f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool, pool_size=args.requests
+            )
+            event.listen(engine.sync_engine, "connect", _register_round_trip)
+            try:
+                return await run(async_request, engine, args.requests, args.users, args.latency_ms)
+            finally:
+                await engine.dispose()
+
+        elapsed, lags = asyncio.run(run_async())
+        report("async", args.requests, elapsed, lags)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Cold-start cost of the API process: lazy init vs the old eager init.
+
+    python -m bench.cold_start [--runs 10] [--database-url URL] [--baseline REF]
+
+Each run is a fresh interpreter, so module caches are cold the way a new
+serverless instance's are. Three timings, median over the runs:
+
+    import        `import api.main`, no DATABASE_URL or XAI_API_KEY needed
+    eager         import plus what import used to do: create the engine,
+                  run create_all and construct GrokAIService
+    first query   import plus the first request that touches the database
+
+Point --database-url at a remote database to include real connection
+and DDL round trips; by default a temporary SQLite file is used. The
+schema is created once up front with `python -m api.migrate`.
+
+--baseline REF exports api/ at that git revision (e.g. the commit before
+the lazy-init work) and times it next to the working tree. Its import
+needs DATABASE_URL and XAI_API_KEY, since that is when it used to create
+the engine, the schema and the AI client; the eager probe is skipped
+there, as its import already is one.
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBES = {
+    "import": """
+import api.main
+""",
+    "eager": """
+import api.main
+from api import models
+from api.database import get_engine
+from api.ai_service import GrokAIService
+models.Base.metadata.create_all(bind=get_engine())
+GrokAIService()
+""",
+    "first query": """
+import api.main
+from fastapi.testclient import TestClient
+# An unknown user's login is one users lookup and no bcrypt
+TestClient(api.main.app).post("/api/token", data={"username": "nobody@example.com", "password": "x"})
+""",
+}
+
+TIMER = """
+import json, time
+started = time.perf_counter()
+exec(compile({probe!r}, "<probe>", "exec"))
+print(json.dumps(time.perf_counter() - started))
+"""
+
+
+BASELINE_PROBES = ("import", "first query")
+
+
+def time_probe(name: str, env: dict, cwd: str = ROOT) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", TIMER.format(probe=PROBES[name])],
+        cwd=cwd, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def export_tree(ref: str, dest: str):
+    """api/ as of a git revision, unpacked under dest"""
+    archive = subprocess.run(["git", "archive", ref, "api"], cwd=ROOT, capture_output=True, check=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(dest)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {key: round(value * 1000, 1) for key, value in (
+        ("median", statistics.median(samples)), ("min", min(samples)), ("max", max(samples))
+    )}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark API cold-start time")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--baseline", metavar="REF", help="git revision to compare the working tree against")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        bare = {key: value for key, value in os.environ.items() if key not in ("DATABASE_URL", "XAI_API_KEY")}
+        configured = {**bare, "DATABASE_URL": database_url, "XAI_API_KEY": "bench"}
+
+        # The schema is a deploy step now, not part of any cold start
+        subprocess.run([sys.executable, "-m", "api.migrate"], cwd=ROOT, env=configured,
+                       capture_output=True, check=True)
+
+        baseline_root = None
+        if args.baseline:
+            baseline_root = os.path.join(tmp, "baseline")
+            export_tree(args.baseline, baseline_root)
+
+        for name in PROBES:
+            env = bare if name == "import" else configured
+            compare = baseline_root is not None and name in BASELINE_PROBES
+            current_samples, baseline_samples = [], []
+            # Interleaved, so load drift on the machine hits both trees alike
+            for _ in range(args.runs):
+                current_samples.append(time_probe(name, env))
+                if compare:
+                    baseline_samples.append(time_probe(name, configured, baseline_root))
+
+            current = summarize(current_samples)
+            line = (f"{name:12} median {current['median']:7.1f} ms  "
+                    f"min {current['min']:7.1f} ms  max {current['max']:7.1f} ms")
+            if compare:
+                baseline = summarize(baseline_samples)
+                change = (current["median"] - baseline["median"]) / baseline["median"] * 100
+                line += f"  | {args.baseline} median {baseline['median']:7.1f} ms ({change:+.0f}%)"
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
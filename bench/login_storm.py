@@ -0,0 +1,115 @@
+"""Latency of other endpoints during a login storm, before and after api.passwords.
+
+    python -m bench.login_storm [--logins 200] [--probes 100]
+
+The bcrypt cost comes from BCRYPT_ROUNDS as in the app, defaulting to 10
+here so a run stays short.
+
+Two minimal apps share the same sync "other" endpoint (a 2 ms stand-in
+for a DB query) and differ only in how login checks the password:
+
+    before  sync handler calling bcrypt on the shared threadpool
+    after   async handler awaiting api.passwords.verify_password
+
+Once a burst of logins is in flight, a probe requests the other
+endpoint every 10 ms; its p50/p99 latency is reported for each app,
+alongside a baseline with no storm. Shed logins (503) are counted.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+# Bench-friendly cost unless the caller pins one
+os.environ.setdefault("BCRYPT_ROUNDS", "10")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, HTTPException  # noqa: E402
+
+from api.passwords import PasswordHashingBusy, get_pwd_context, verify_password  # noqa: E402
+
+PASSWORD = "correct horse battery staple"
+
+
+def build_app(hashed: str, offloaded: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/other")
+    def other():
+        time.sleep(0.002)
+        return {"ok": True}
+
+    if offloaded:
+        @app.post("/login")
+        async def login():
+            try:
+                valid, _ = await verify_password(PASSWORD, hashed)
+            except PasswordHashingBusy:
+                raise HTTPException(status_code=503)
+            return {"valid": valid}
+    else:
+        @app.post("/login")
+        def login():
+            return {"valid": get_pwd_context().verify(PASSWORD, hashed)}
+
+    return app
+
+
+async def probe(client: httpx.AsyncClient, count: int) -> List[float]:
+    latencies = []
+    for _ in range(count):
+        started = time.perf_counter()
+        await client.get("/other")
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.01)
+    return latencies
+
+
+async def storm(app: FastAPI, logins: int, probes: int):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login_tasks = [asyncio.create_task(client.post("/login")) for _ in range(logins)]
+        # Let the burst be dispatched (it shares this loop) before probing
+        await asyncio.sleep(0.5)
+        latencies = await probe(client, probes)
+        responses = await asyncio.gather(*login_tasks)
+    return latencies, sum(1 for response in responses if response.status_code == 503)
+
+
+async def baseline(app: FastAPI, probes: int) -> List[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        return await probe(client, probes)
+
+
+def report(name: str, latencies: List[float], shed: Optional[int] = None):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    line = f"{name:9} other p50 {statistics.median(latencies) * 1000:7.1f} ms  p99 {p99 * 1000:7.1f} ms"
+    if shed is not None:
+        line += f"  logins shed {shed}"
+    print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark endpoint latency during a login storm")
+    parser.add_argument("--logins", type=int, default=200, help="concurrent logins in the storm")
+    parser.add_argument("--probes", type=int, default=100, help="requests to the other endpoint")
+    args = parser.parse_args(argv)
+
+    hashed = get_pwd_context().hash(PASSWORD)
+    print(f"bcrypt rounds {os.environ['BCRYPT_ROUNDS']}, {args.logins} concurrent logins")
+
+    report("no storm", asyncio.run(baseline(build_app(hashed, offloaded=False), args.probes)))
+    latencies, _ = asyncio.run(storm(build_app(hashed, offloaded=False), args.logins, args.probes))
+    report("before", latencies)
+    latencies, shed = asyncio.run(storm(build_app(hashed, offloaded=True), args.logins, args.probes))
+    report("after", latencies, shed)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
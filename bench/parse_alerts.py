@@ -0,0 +1,165 @@
+"""Per-email parse time of bank alerts: the original parser vs api.matcher.
+
+    python -m bench.parse_alerts [--emails 5000] [--repeat 3] [--seed 1]
+
+Builds a synthetic corpus of alert emails (several banks, debit and
+credit wording, merchants from every category, filler text around the
+alert) and times the pre-matcher parse_transaction_from_email, kept
+verbatim below, against the current one on the same corpus.
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from api.email_services import EmailTransactionParser
+
+BANKS = ["HDFC Bank", "ICICI Bank", "SBI", "Axis Bank", "Kotak", "IDFC First", "Yes Bank", "IndusInd",
+         "PNB", "Canara", "Union Bank"]
+MERCHANTS = ["ZOMATO", "SWIGGY", "AMAZON", "FLIPKART", "UBER", "OLA", "NETFLIX", "SPOTIFY",
+             "APOLLO PHARMACY", "TATA POWER", "JIO RECHARGE", "COURSERA", "DMART", "INDIAN OIL"]
+FILLER = ("If you did not authorise this transaction please call our 24x7 helpline immediately. "
+          "Never share your OTP, PIN or card details with anyone. This is a system generated mail. ")
+
+
+def legacy_categorize(title: str, body: str) -> str:
+    text = (title + " " + body).lower()
+
+    categories = {
+        "Food": ["restaurant", "cafe", "zomato", "swiggy", "food", "dining", "hotel", "eatery"],
+        "Shopping": ["amazon", "flipkart", "myntra", "shopping", "mall", "store", "mart", "retail"],
+        "Transport": ["uber", "ola", "petrol", "diesel", "fuel", "parking", "toll", "transport"],
+        "Utilities": ["electricity", "water", "gas", "bill", "utility", "broadband", "internet", "mobile",
+                      "recharge"],
+        "Entertainment": ["netflix", "prime", "spotify", "movie", "cinema", "entertainment", "subscription"],
+        "Healthcare": ["hospital", "clinic", "pharmacy", "medical", "doctor", "health"],
+        "Education": ["school", "college", "university", "course", "tuition", "education"],
+        "Income": ["salary", "credited", "credit", "received", "deposit", "income"]
+    }
+
+    for category, keywords in categories.items():
+        if any(keyword in text for keyword in keywords):
+            return category
+
+    return "Other"
+
+
+def legacy_parse(email_body: str, subject: str) -> Optional[Dict]:
+    """parse_transaction_from_email as it was before api.matcher"""
+    transaction = {
+        "title": "",
+        "amount": 0.0,
+        "type": "expense",
+        "category": "Other",
+        "bank": "",
+        "date": datetime.now().isoformat()
+    }
+
+    banks = ["HDFC", "ICICI", "SBI", "Axis", "Kotak", "IDFC", "Yes Bank", "IndusInd", "PNB", "BOB", "Canara",
+             "Union Bank"]
+    for bank in banks:
+        if bank.lower() in subject.lower() or bank.lower() in email_body.lower():
+            transaction["bank"] = bank
+            break
+
+    amount_patterns = [
+        r'(?:Rs\.?|INR|₹)\s*([0-9,]+(?:\.[0-9]{2})?)',
+        r'(?:amount|Amount|AMOUNT)[\s:]*(?:Rs\.?|INR|₹)?\s*([0-9,]+(?:\.[0-9]{2})?)',
+        r'(?:debited|credited|spent|paid)[\s:]*(?:Rs\.?|INR|₹)?\s*([0-9,]+(?:\.[0-9]{2})?)'
+    ]
+
+    for pattern in amount_patterns:
+        match = re.search(pattern, email_body, re.IGNORECASE)
+        if match:
+            amount_str = match.group(1).replace(',', '')
+            transaction["amount"] = float(amount_str)
+            break
+
+    if any(word in email_body.lower() for word in ["credited", "credit", "received", "deposit"]):
+        transaction["type"] = "income"
+        transaction["amount"] = abs(transaction["amount"])
+    elif any(
+            word in email_body.lower() for word in ["debited", "debit", "spent", "paid", "purchase", "withdrawal"]):
+        transaction["type"] = "expense"
+        transaction["amount"] = -abs(transaction["amount"])
+
+    merchant_patterns = [
+        r'(?:at|to|from)\s+([A-Z][A-Za-z0-9\s&]+?)(?:\s+on|\.|,)',
+        r'(?:merchant|Merchant|MERCHANT)[\s:]+([A-Za-z0-9\s&]+?)(?:\s+on|\.|,)',
+        r'(?:transaction at|payment to)\s+([A-Za-z0-9\s&]+?)(?:\s+on|\.|,)'
+    ]
+
+    for pattern in merchant_patterns:
+        match = re.search(pattern, email_body)
+        if match:
+            transaction["title"] = match.group(1).strip()
+            break
+
+    if not transaction["title"]:
+        transaction["title"] = subject[:50]
+
+    transaction["category"] = legacy_categorize(transaction["title"], email_body)
+
+    if transaction["amount"] != 0.0:
+        return transaction
+    return None
+
+
+def build_corpus(size: int, seed: int) -> List[Tuple[str, str]]:
+    """(body, subject) pairs shaped like real bank alerts"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        bank = rng.choice(BANKS)
+        amount = f"{rng.randint(10, 99999):,}.{rng.randint(0, 99):02d}"
+        currency = rng.choice(["Rs.", "Rs", "INR", "₹"])
+        account = f"XX{rng.randint(1000, 9999)}"
+        day = f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2024"
+        if rng.random() < 0.25:
+            subject = f"{bank}: Amount credited to your account"
+            alert = f"{currency} {amount} has been credited to your {bank} account {account} on {day}. Salary received."
+        else:
+            merchant = rng.choice(MERCHANTS)
+            subject = f"Alert: {bank} debit card transaction"
+            alert = f"{currency} {amount} debited from your {bank} account {account} at {merchant} on {day}."
+        body = "Dear Customer,\n" + alert + "\n" + FILLER * rng.randint(1, 4)
+        corpus.append((body, subject))
+    return corpus
+
+
+def time_parser(parse, corpus: List[Tuple[str, str]], repeat: int) -> float:
+    """Best-of-repeat seconds per email"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for body, subject in corpus:
+            parse(body, subject)
+        best = min(best, time.perf_counter() - started)
+    return best / len(corpus)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark bank alert parsing")
+    parser.add_argument("--emails", type=int, default=5000, help="synthetic corpus size")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per parser; the best is reported")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.emails, args.seed)
+    current = EmailTransactionParser.parse_transaction_from_email
+
+    before = time_parser(legacy_parse, corpus, args.repeat)
+    after = time_parser(current, corpus, args.repeat)
+    parsed = sum(1 for body, subject in corpus if current(body, subject))
+
+    print(f"{args.emails} emails, {parsed} parsed by the current matcher")
+    print(f"before: {before * 1e6:8.1f} us/email")
+    print(f"after:  {after * 1e6:8.1f} us/email  ({before / after:.1f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
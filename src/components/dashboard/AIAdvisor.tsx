@@ -25,7 +25,7 @@ const AIAdvisor = () => {
   setIsLoading(true);
   try {
     const token = localStorage.getItem('token');
-    const response = await fetch(`${API_URL}/api/ai/advice`, {
+    const response = await fetch(`${API_URL}/api/ai/advice/stream`, {
       method: 'POST',
       headers: {
         'Authorization': `Bearer ${token}`,
@@ -34,9 +34,37 @@ const AIAdvisor = () => {
       body: JSON.stringify({ query: input })
     });
 
-    const data = await response.json();
-    setAiResponse(data.advice);
+    if (!response.ok || !response.body) {
+      throw new Error("Failed to get AI advice");
+    }
+
+    // Render tokens as they arrive over Server-Sent Events
+    setAiResponse("");
     setInput("");
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      const events = buffer.split("\n\n");
+      buffer = events.pop() || "";
+      for (const raw of events) {
+        const event = raw.match(/^event: (.*)$/m)?.[1];
+        const data = raw.match(/^data: (.*)$/m)?.[1];
+        if (!data) continue;
+        const payload = JSON.parse(data);
+        if (event === "error") {
+          throw new Error(payload.detail);
+        }
+        if (payload.token) {
+          setAiResponse((current) => current + payload.token);
+        }
+      }
+    }
   } catch (error) {
     toast({
       title: "Error",
@@ -100,19 +100,42 @@ const GmailConnect = () => {
         })
       });
 
-      const data = await response.json();
+      let data = await response.json();
 
-      if (response.ok) {
+      if (!response.ok) {
+        toast({
+          title: "Sync failed",
+          description: data.detail || "Failed to sync transactions",
+          variant: "destructive"
+        });
+        return;
+      }
+
+      // Sync runs in the background; poll the job until it finishes
+      while (data.status === "queued" || data.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, 1500));
+        const jobResponse = await fetch(`${API_URL}/api/gmail/sync/${data.id}`, {
+          headers: {
+            "Authorization": `Bearer ${token}`
+          }
+        });
+        data = await jobResponse.json();
+        if (!jobResponse.ok) {
+          throw new Error(data.detail);
+        }
+      }
+
+      if (data.status === "succeeded") {
         setLastSynced("Just now");
         setTransactionCount(data.new_transactions || 0);
         toast({
           title: "Sync completed!",
-          description: `Found ${data.total_found} transactions, added ${data.new_transactions} new ones`
+          description: `Found ${data.transactions_found} transactions, added ${data.new_transactions} new ones`
         });
       } else {
         toast({
           title: "Sync failed",
-          description: data.detail || "Failed to sync transactions",
+          description: data.error || "Failed to sync transactions",
           variant: "destructive"
         });
       }
@@ -1,12 +1,8 @@
 import { Target, TrendingUp } from "lucide-react";
 import { Progress } from "@/components/ui/progress";
-import { useQuery } from "@tanstack/react-query";
+import { useDashboard } from "@/hooks/use-dashboard";
 import { useToast } from "@/hooks/use-toast";
 
-const API_URL = import.meta.env.PROD
-  ? "https://your-project.vercel.app"
-  : "http://localhost:8000";
-
 interface Goal {
   id: string;
   title: string;
@@ -25,17 +21,8 @@ const mockGoals: Goal[] = [
 const GoalCard = () => {
   const { toast } = useToast();
 
-  const { data: goals, isLoading } = useQuery({
-    queryKey: ['goals'],
-    queryFn: async () => {
-      const token = localStorage.getItem('token');
-      const response = await fetch(`${API_URL}/api/goals`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      if (!response.ok) throw new Error('Failed to fetch');
-      return response.json();
-    }
-  });
+  const { data: dashboard, isLoading } = useDashboard();
+  const goals = dashboard?.goals;
   if (isLoading) return <div className="glass-card rounded-2xl p-6">Loading goals...</div>;
   return (
     <div className="glass-card rounded-2xl p-6 opacity-0 animate-fade-in-up" style={{ animationDelay: "300ms" }}>
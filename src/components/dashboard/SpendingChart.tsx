@@ -1,8 +1,5 @@
 import { PieChart, Pie, Cell, ResponsiveContainer, Tooltip } from "recharts";
-import { useQuery } from "@tanstack/react-query";
-const API_URL = import.meta.env.PROD
-  ? "https://your-project.vercel.app"
-  : "http://localhost:8000";
+import { useDashboard } from "@/hooks/use-dashboard";
 const spendingData = [
   { name: "Housing", value: 1500, color: "hsl(160, 84%, 39%)" },
   { name: "Food", value: 450, color: "hsl(38, 92%, 50%)" },
@@ -13,17 +10,8 @@ const spendingData = [
 ];
 
 const SpendingChart = () => {
-  const { data: analyticsData, isLoading } = useQuery({
-    queryKey: ['spending-analytics'],
-    queryFn: async () => {
-      const token = localStorage.getItem('token');
-      const response = await fetch(`${API_URL}/api/analytics/spending`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      if (!response.ok) throw new Error('Failed to fetch');
-      return response.json();
-    }
-  });
+  const { data: dashboard, isLoading } = useDashboard();
+  const analyticsData = dashboard?.spending;
 
   const spendingData = analyticsData?.data || [];
   const total = analyticsData?.total || 0;
@@ -0,0 +1,25 @@
+import { useQuery } from "@tanstack/react-query";
+
+const API_URL = import.meta.env.PROD
+  ? "https://your-project.vercel.app"
+  : "http://localhost:8000";
+
+// Sections the dashboard widgets render; fetched together in one request
+const DASHBOARD_FIELDS = "stats,transactions,goals,spending";
+// Same page size the transaction list got from /api/transactions
+const TRANSACTION_LIMIT = 50;
+
+export function useDashboard() {
+  // Every widget shares this query key, so React Query sends one request
+  return useQuery({
+    queryKey: ['dashboard'],
+    queryFn: async () => {
+      const token = localStorage.getItem('token');
+      const response = await fetch(`${API_URL}/api/dashboard?fields=${DASHBOARD_FIELDS}&limit=${TRANSACTION_LIMIT}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      });
+      if (!response.ok) throw new Error('Failed to fetch');
+      return response.json();
+    }
+  });
+}
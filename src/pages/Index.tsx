@@ -6,23 +6,10 @@ import SpendingChart from "@/components/dashboard/SpendingChart";
 import GoalCard from "@/components/dashboard/GoalCard";
 import TransactionList from "@/components/dashboard/TransactionList";
 import AIAdvisor from "@/components/dashboard/AIAdvisor";
-import { useQuery } from "@tanstack/react-query";
-const API_URL = import.meta.env.PROD
-  ? "https://your-project.vercel.app"
-  : "http://localhost:8000";
-
+import { useDashboard } from "@/hooks/use-dashboard";
 const Index = () => {
-  const { data: stats, isLoading } = useQuery({
-    queryKey: ['dashboard-stats'],
-    queryFn: async () => {
-      const token = localStorage.getItem('token');
-      const response = await fetch(`${API_URL}/api/dashboard/stats`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      });
-      if (!response.ok) throw new Error('Failed to fetch');
-      return response.json();
-    }
-  });
+  const { data: dashboard, isLoading } = useDashboard();
+  const stats = dashboard?.stats;
   return (
     <div className="min-h-screen bg-background dark">
       <Navbar />